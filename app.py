@@ -1,40 +1,60 @@
-from flask import Flask, request, jsonify, send_file, render_template, session
+from flask import Flask, request, jsonify, send_file, render_template, session, Response, stream_with_context
 from flask_cors import CORS
-from moviepy import VideoFileClip, ImageClip, CompositeVideoClip, concatenate_videoclips, CompositeAudioClip
-from moviepy.audio.io.AudioFileClip import AudioFileClip
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from moviepy import VideoFileClip, VideoClip
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-import tempfile
-import time
+from chrome_pool import chrome_pool
+from native_renderer import render_chat_sequence
+from tts_cache import TTSCache, tts_cache
+from rate_limit import get_throttle
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from background_store import BackgroundStore, BACKGROUND_STORE_SETTINGS
+from background_segment import BackgroundSegment, probe_video
+from jobs import JobStore, JobRunner, QueueFull, JOB_SETTINGS
+from progress import progress_broker, PROGRESS_SETTINGS
+from workspace import workspace_manager
+from encoder import ENCODE_SETTINGS, encode_renditions, quality_settings, canvas_size
+from sfx_bank import SoundEffectBank, decode_pcm
+from audio_mixer import mix_timeline
+from ffmpeg_compositor import compose_with_ffmpeg
+from segmented_encoder import encode_segmented
+from segment_cache import FrameCache, frame_cache, segment_cache, SEGMENT_CACHE_SETTINGS
+from overlay_blend import OverlaySpec, StaticOverlayCompositor
+from drive_uploader import drive_uploader
+from http_client import http_client
+from search_cache import SearchCache, search_cache, SEARCH_CACHE_SETTINGS
+from voice_catalog import VoiceCatalog, VoiceListError, VOICE_CATALOG_SETTINGS
+from metrics import registry as metrics_registry, timed, record_bytes, record_file_bytes, track_peak_rss
 import os
 from PIL import Image, ImageFilter, ImageDraw, ImageFont
 import io
-import numpy as np
 import requests
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-import subprocess
 from datetime import datetime
-import json     
 import traceback
-import shutil
+import threading
+import hashlib
 
 app = Flask(__name__)
 CORS(app)
 
-# Global list to track temporary files for cleanup
-temp_files = []
-
 # Add these configuration variables at the top with your other constants
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
 GOOGLE_CSE_ID = os.environ.get('GOOGLE_CSE_ID')
 
+ELEVENLABS_MODEL_ID = "eleven_monolingual_v1"
+# Base URL of the ElevenLabs API (pointed at a local stand-in by benchmark.py)
+ELEVENLABS_API_BASE = os.environ.get('ELEVENLABS_API_BASE', 'https://api.elevenlabs.io').rstrip('/')
+# Voice listings are shared by /api/generate, /api/validate-key and /api/fetch-voices
+voice_catalog = VoiceCatalog(ELEVENLABS_API_BASE, **VOICE_CATALOG_SETTINGS)
+# Concurrent synthesis: worker threads per job and request pacing per API key
+TTS_SETTINGS = {
+    'concurrency': int(os.environ.get('TTS_CONCURRENCY', '4')),
+    'requests_per_second': float(os.environ.get('TTS_REQUESTS_PER_SECOND', '2')),
+    'burst': int(os.environ.get('TTS_BURST', '4')),
+}
 VOICE_SETTINGS = {
     "stability": 0.75,
     "similarity_boost": 0.45,
@@ -47,56 +67,40 @@ SOUND_EFFECTS = {
     'imessage_text': os.path.join('static', 'sfx', 'iMessage Text.mp3'),
 }
 
-GOOGLE_DRIVE_SETTINGS = {
-    'folder_id': '1Q-w2JOD4fiEhI8bs8btcF0zsE92SuXv5',  # The Google Drive folder ID where videos will be uploaded
-    'credentials_path': 'service-account.json'  # Path to your service account JSON file
+# Every sound effect is decoded once per worker at the output sample rate
+sfx_bank = SoundEffectBank(SOUND_EFFECTS, ENCODE_SETTINGS['audio_rate']).load()
+
+# Chat frame renderer: 'selenium' (headless Chrome) or 'native' (Pillow, no browser)
+CHAT_RENDER_BACKEND = os.environ.get('CHAT_RENDER_BACKEND', 'selenium').lower()
+
+# Compositor: 'moviepy' (in-process numpy blending), 'ffmpeg' (one filter graph)
+# or 'segmented' (parallel per-segment processes joined without re-encoding)
+COMPOSITOR = os.environ.get('COMPOSITOR', 'moviepy').lower()
+
+# Cloudinary video URLs (updated with working URLs)
+CLOUDINARY_VIDEOS = {
+    'background': 'https://res.cloudinary.com/dokndhglh/video/upload/c_scale,h_1080,q_100/v1739342327/h3mqdaupaop1eprdcld3.mp4',
+    'background_1': 'https://res.cloudinary.com/dokndhglh/video/upload/c_scale,h_1080,q_100/v1739342660/f1bhluhc6si77uapdawe_slowed_oq2v20.mp4',
+    'background_2': 'https://res.cloudinary.com/dokndhglh/video/upload/c_scale,h_1080,q_100/v1739343309/dxo2rlb7kckps0fnfvv4_slowed_mmptbq.mp4',
+    'background_3': 'https://res.cloudinary.com/dokndhglh/video/upload/c_scale,h_1080,q_100/v1739343390/pytgss2oi9idgch1xhrw_slowed_ku8hde.mp4',
+    'background_4': 'https://res.cloudinary.com/dokndhglh/video/upload/v1739599641/Minecraft_Jump_and_Run_Gameplay_TIKTOK_Format_60fps_1440p_HD_No_Ads_No_Credits_3_-_Minecraft_Gameplay_1080p_h264_mute_youtube_online-video-cutter.com_1_eprmyf.mp4'
 }
 
-def get_google_drive_service():
-    """Get Google Drive service using service account"""
-    try:
-        credentials = service_account.Credentials.from_service_account_file(
-            GOOGLE_DRIVE_SETTINGS['credentials_path'],
-            scopes=['https://www.googleapis.com/auth/drive.file']
-        )
-        return build('drive', 'v3', credentials=credentials)
-    except Exception as e:
-        print(f"Error creating Drive service: {str(e)}")
-        return None
+background_store = BackgroundStore(BACKGROUND_STORE_SETTINGS['directory'], CLOUDINARY_VIDEOS,
+                                   max_retries=BACKGROUND_STORE_SETTINGS['max_retries'])
+if BACKGROUND_STORE_SETTINGS['prefetch']:
+    # Warm the local library in the background when the worker starts
+    background_store.start_prefetch()
 
+@timed('upload_to_drive', failed_when_none=True)
 def upload_to_drive(file_path, file_name):
-    """Upload file to Google Drive using service account"""
+    """Upload file to Google Drive using the shared uploader"""
     try:
-        service = get_google_drive_service()
-        if not service:
-            return None
-
-        file_metadata = {
-            'name': file_name,
-            'parents': [GOOGLE_DRIVE_SETTINGS['folder_id']] if GOOGLE_DRIVE_SETTINGS['folder_id'] else None
-        }
-        
-        media = MediaFileUpload(
-            file_path,
-            mimetype='video/mp4',
-            resumable=True
-        )
-        
-        file = service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id, webViewLink'
-        ).execute()
-        
-        return {
-            'id': file.get('id'),
-            'link': file.get('webViewLink')
-        }
-        
+        return drive_uploader.upload(file_path, file_name)
     except Exception as e:
         print(f"Error uploading to Google Drive: {str(e)}")
         return None
-        
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -147,191 +151,295 @@ def generate_default_profile_image(name, size=200):
         print(f"Error generating default profile image: {e}")
         return None
 
-def capture_chat_interface(messages, show_header=True, header_data=None):
-    chrome_options = Options()
-    chrome_options.add_argument('--headless')
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--hide-scrollbars')
-    chrome_options.add_argument('--force-device-scale-factor=1')
-    chrome_options.add_argument('--window-size=414,900')
-    
-    driver = webdriver.Chrome(options=chrome_options)
-    try:
-        driver.get('http://127.0.0.1:8080')
-        
-        # Wait for elements
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "dynamic-container"))
-        )
-        
-        # Apply theme if provided
-        if header_data and header_data.get('theme') == 'dark':
-            driver.execute_script("""
-                document.querySelector('.container').classList.add('dark-theme');
-            """)
-            time.sleep(0.5)  # Wait for theme to apply
-        
-        # Set back button position from localStorage
-        driver.execute_script("""
-            const backButton = document.querySelector('.header-left');
-            if (backButton) {
-                const savedPosition = localStorage.getItem('backButtonPosition');
-                if (savedPosition) {
-                    const position = JSON.parse(savedPosition);
-                    backButton.style.position = 'absolute';
-                    backButton.style.left = position.left;
-                    backButton.style.top = position.top;
-                    backButton.style.zIndex = '1000';
-                }
+# Applies theme, back button position and header data, then resolves once the
+# profile image is decoded and the page has gone through a layout pass.
+PREPARE_CHAT_PAGE_JS = """
+    const [theme, profileImage, headerName, done] = arguments;
+    const settle = () => new Promise(resolve => requestAnimationFrame(() => requestAnimationFrame(resolve)));
+    const decoded = (img) => img.decode ? img.decode().catch(() => {}) : Promise.resolve();
+
+    const container = document.querySelector('.container');
+    const messageContainer = document.getElementById('messageContainer');
+
+    // Apply theme if provided
+    if (theme === 'dark') {
+        container.classList.add('dark-theme');
+    }
+
+    // Set back button position from localStorage
+    const backButton = document.querySelector('.header-left');
+    if (backButton) {
+        const savedPosition = localStorage.getItem('backButtonPosition');
+        if (savedPosition) {
+            const position = JSON.parse(savedPosition);
+            backButton.style.position = 'absolute';
+            backButton.style.left = position.left;
+            backButton.style.top = position.top;
+            backButton.style.zIndex = '1000';
+        }
+    }
+
+    // Set the header name
+    const headerNameElement = document.getElementById('headerName');
+    if (headerNameElement && headerName) {
+        headerNameElement.textContent = headerName;
+    }
+
+    // Set transparent background
+    document.body.style.background = 'transparent';
+    document.documentElement.style.background = 'transparent';
+
+    // Remove input area
+    const inputArea = document.querySelector('.input-area');
+    if (inputArea) inputArea.remove();
+
+    // Reset container styles
+    container.style.minHeight = 'unset';
+    container.style.height = 'auto';
+    messageContainer.style.height = 'auto';
+    messageContainer.style.maxHeight = 'none';
+    messageContainer.style.minHeight = 'unset';
+    messageContainer.querySelector('.dynamic-container').innerHTML = '';
+
+    // Set the profile image and wait until it is decoded
+    const waits = [];
+    const imgElement = document.getElementById('profileImage');
+    if (imgElement && profileImage) {
+        imgElement.src = profileImage;
+        waits.push(decoded(imgElement));
+    }
+    if (document.fonts) {
+        waits.push(document.fonts.ready);
+    }
+    Promise.all(waits).then(settle).then(() => done(true));
+"""
+
+# Appends message bubbles (optionally clearing the old ones first) and resolves
+# once every new picture is decoded and layout has settled.
+RENDER_MESSAGES_JS = """
+    const [messages, showHeader, clearExisting, done] = arguments;
+    const settle = () => new Promise(resolve => requestAnimationFrame(() => requestAnimationFrame(resolve)));
+    const decoded = (img) => img.decode ? img.decode().catch(() => {}) : Promise.resolve();
+
+    const container = document.querySelector('.container');
+    const header = document.querySelector('.header');
+    const dynamicContainer = document.querySelector('#messageContainer .dynamic-container');
+
+    // Show/hide header
+    if (header) {
+        header.style.display = showHeader ? 'flex' : 'none';
+    }
+
+    // Clear existing messages
+    if (clearExisting) {
+        dynamicContainer.innerHTML = '';
+    }
+
+    const waits = [];
+    messages.forEach(msg => {
+        if (msg && msg.text) {
+            const messageDiv = document.createElement('div');
+            messageDiv.className = `message ${msg.is_sender ? 'sender' : 'receiver'} ${msg.type === 'picture' ? 'picture' : ''}`;
+            messageDiv.setAttribute('data-id', msg.id);
+
+            if (msg.type === 'picture') {
+                const img = document.createElement('img');
+                img.src = msg.text;
+                img.style.maxWidth = '100%';
+                img.style.borderRadius = '12px';
+                messageDiv.appendChild(img);
+                waits.push(decoded(img));
+            } else {
+                messageDiv.textContent = msg.text.trim();
             }
-        """)
-        time.sleep(0.5)  # Wait for position to apply
-        
-        # Apply header data if provided
-        if header_data:
-            # Get profile image or generate default
-            profile_image = header_data.get('profileImage', '')
-            header_name = header_data.get('headerName', 'John Doe')
-            
-            if not profile_image or profile_image.endswith('profile.jpg'):
-                # Generate default profile image with first letter
-                profile_image = generate_default_profile_image(header_name)
-            
-            # Set the profile image
-            if profile_image:
-                driver.execute_script("""
-                    const imgElement = document.getElementById('profileImage');
-                    if (imgElement) {
-                        imgElement.src = arguments[0];
-                        // Ensure image is loaded before proceeding
-                        return new Promise((resolve) => {
-                            imgElement.onload = resolve;
-                            imgElement.onerror = resolve;
-                        });
-                    }
-                """, profile_image)
-                time.sleep(1)  # Wait for image to load
-            
-            # Set the header name
-            if header_name:
-                driver.execute_script("""
-                    const headerNameElement = document.getElementById('headerName');
-                    if (headerNameElement) {
-                        headerNameElement.textContent = arguments[0];
-                        headerNameElement.offsetHeight;
-                        headerNameElement.style.display = 'none';
-                        headerNameElement.offsetHeight;
-                        headerNameElement.style.display = '';
-                        headerNameElement.offsetHeight;
-                    }
-                """, header_name)
-                time.sleep(0.5)  # Wait for name to update
-        
-        # Set transparent background
-        driver.execute_script("""
-            document.body.style.background = 'transparent';
-            document.documentElement.style.background = 'transparent';
-        """)
-        
-        # Modified JavaScript to properly handle sound effects
-        driver.execute_script("""
-            const messages = arguments[0];
-            const showHeader = arguments[1];
-            
-            // Remove input area
-            const inputArea = document.querySelector('.input-area');
-            if (inputArea) inputArea.remove();
-            
-            const container = document.querySelector('.container');
-            const messageContainer = document.getElementById('messageContainer');
-            const header = document.querySelector('.header');
-            const dynamicContainer = messageContainer.querySelector('.dynamic-container');
-            
-            // Show/hide header
-            if (header) {
-                header.style.display = showHeader ? 'flex' : 'none';
+
+            if (msg.soundEffect) {
+                messageDiv.setAttribute('data-sound-effect', msg.soundEffect);
             }
-            
-            // Reset container styles
-            container.style.minHeight = 'unset';
-            container.style.height = 'auto';
-            messageContainer.style.height = 'auto';
-            messageContainer.style.maxHeight = 'none';
-            messageContainer.style.minHeight = 'unset';
-            
-            // Clear existing messages
-            dynamicContainer.innerHTML = '';
-            
-            messages.forEach(msg => {
-                if (msg && msg.text) {
-                    const messageDiv = document.createElement('div');
-                    messageDiv.className = `message ${msg.is_sender ? 'sender' : 'receiver'} ${msg.type === 'picture' ? 'picture' : ''}`;
-                    messageDiv.setAttribute('data-id', msg.id);
-                    
-                    if (msg.type === 'picture') {
-                        const img = document.createElement('img');
-                        img.src = msg.text;
-                        img.style.maxWidth = '100%';
-                        img.style.borderRadius = '12px';
-                        messageDiv.appendChild(img);
-                    } else {
-                        messageDiv.textContent = msg.text.trim();
-                    }
-                    
-                    if (msg.soundEffect) {
-                        messageDiv.setAttribute('data-sound-effect', msg.soundEffect);
-                    }
-                    
-                    dynamicContainer.appendChild(messageDiv);
-                }
-            });
 
-            // Force layout recalculation
-            container.offsetHeight;
-        """, messages, show_header)
-        
-        # Wait for messages to render
-        time.sleep(1.5)
-        
-        # Take screenshot
-        container = driver.find_element(By.CLASS_NAME, "container")
-        screenshot = container.screenshot_as_png
-        image = Image.open(io.BytesIO(screenshot))
-        
-        # Convert to RGBA to handle transparency
-        image = image.convert('RGBA')
-        
-        # Create a mask for rounded corners
-        mask = Image.new('L', image.size, 0)
-        mask_draw = ImageDraw.Draw(mask)
-        mask_draw.rounded_rectangle([(0, 0), (image.size[0]-1, image.size[1]-1)], 20, fill=255)
-        
-        # Apply the mask
-        output = Image.new('RGBA', image.size, (0, 0, 0, 0))
-        output.paste(image, mask=mask)
-        
-        # Crop to content
-        bbox = output.getbbox()
-        if bbox:
-            output = output.crop(bbox)
-        
-        return output
-        
+            dynamicContainer.appendChild(messageDiv);
+        }
+    });
+
+    // Force layout recalculation
+    container.offsetHeight;
+    Promise.all(waits).then(settle).then(() => done(true));
+"""
+
+def _prepare_chat_page(driver, header_data):
+    """Set up theme and header once per page load"""
+    # Wait for elements (the pool has already loaded the page)
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CLASS_NAME, "dynamic-container"))
+    )
+    driver.set_script_timeout(15)
+
+    theme = None
+    profile_image = None
+    header_name = None
+    if header_data:
+        theme = header_data.get('theme')
+        # Get profile image or generate default
+        profile_image = header_data.get('profileImage', '')
+        header_name = header_data.get('headerName', 'John Doe')
+
+        if not profile_image or profile_image.endswith('profile.jpg'):
+            # Generate default profile image with first letter
+            profile_image = generate_default_profile_image(header_name)
+
+    driver.execute_async_script(PREPARE_CHAT_PAGE_JS, theme, profile_image, header_name)
+
+def _screenshot_chat_container(driver):
+    """Screenshot the chat container and cut it out with rounded corners"""
+    container = driver.find_element(By.CLASS_NAME, "container")
+    screenshot = container.screenshot_as_png
+    image = Image.open(io.BytesIO(screenshot))
+
+    # Convert to RGBA to handle transparency
+    image = image.convert('RGBA')
+
+    # Create a mask for rounded corners
+    mask = Image.new('L', image.size, 0)
+    mask_draw = ImageDraw.Draw(mask)
+    mask_draw.rounded_rectangle([(0, 0), (image.size[0]-1, image.size[1]-1)], 20, fill=255)
+
+    # Apply the mask
+    output = Image.new('RGBA', image.size, (0, 0, 0, 0))
+    output.paste(image, mask=mask)
+
+    # Crop to content
+    bbox = output.getbbox()
+    if bbox:
+        output = output.crop(bbox)
+
+    return output
+
+@timed('capture_chat_interface', failed_when_none=True)
+def capture_chat_interface(messages, show_header=True, header_data=None):
+    try:
+        with chrome_pool.session() as driver:
+            _prepare_chat_page(driver, header_data)
+            driver.execute_async_script(RENDER_MESSAGES_JS, messages, show_header, True)
+            return _screenshot_chat_container(driver)
+
     except Exception as e:
         print(f"Error capturing chat interface: {e}")
         import traceback
         traceback.print_exc()
         return None
-        
-    finally:
-        driver.quit()
 
+def capture_chat_sequence(messages, header_data=None, window_size=5, on_frame=None, needed=None, suspect=None):
+    """Capture one frame per message in a single browser session.
+
+    Messages are shown in windows of ``window_size``: each window starts from
+    an empty chat and the header is only shown for the first window. Frame
+    ``k`` shows the current window up to and including message ``k``. Failed
+    frames are returned as None so callers can keep messages aligned.
+    ``needed`` limits the screenshots to those indexes (windows without any
+    are skipped). ``on_frame(done, total)`` is called after each capture.
+
+    A message that fails to render loses only its own frame: the next one
+    redraws the window so far from an empty chat. Frames captured after a
+    failure in their window are added to ``suspect`` (if given), since a
+    half-loaded picture may still be missing from them.
+    """
+    frames = [None] * len(messages)
+    needed = set(range(len(messages)) if needed is None else needed)
+    done = 0
+    try:
+        with chrome_pool.session() as driver:
+            _prepare_chat_page(driver, header_data)
+
+            window_failed = False
+            rebuild = False
+            for index, msg in enumerate(messages):
+                window_start = index - index % window_size
+                if not needed.intersection(range(window_start, window_start + window_size)):
+                    continue
+                if index == window_start:
+                    window_failed = rebuild = False
+                show_header = index < window_size
+                # After a failed render the chat's contents are unknown, so redraw the whole window so far
+                batch = messages[window_start:index + 1] if rebuild else [msg]
+                clear = index == window_start or rebuild
+                try:
+                    driver.execute_async_script(RENDER_MESSAGES_JS, batch, show_header, clear)
+                except Exception as e:
+                    print(f"Error rendering chat message {index + 1}/{len(messages)}: {e}")
+                    window_failed = rebuild = True
+                    continue
+                rebuild = False
+                if index not in needed:
+                    continue
+                try:
+                    frames[index] = _screenshot_chat_container(driver)
+                except Exception as e:
+                    print(f"Error capturing chat frame {index + 1}/{len(messages)}: {e}")
+                    continue
+                if window_failed and suspect is not None:
+                    suspect.add(index)
+                done += 1
+                print(f"Captured chat frame {index + 1}/{len(messages)}")
+                if on_frame:
+                    on_frame(done, len(needed))
+
+    except Exception as e:
+        print(f"Error capturing chat sequence: {e}")
+        traceback.print_exc()
+
+    return frames
+
+@timed('capture_chat_frames')
+def capture_chat_frames(messages, header_data=None, on_frame=None, window_size=5):
+    """Render one chat frame per message with the configured backend.
+
+    Frames are looked up in the frame cache first, so after an edit only
+    the chat states that actually changed are captured again.
+    """
+    backend = (header_data or {}).get('renderBackend') or CHAT_RENDER_BACKEND
+    frames = [None] * len(messages)
+    keys = []
+    for index in range(len(messages)):
+        window_start = index - index % window_size
+        keys.append(FrameCache.make_key(messages[window_start:index + 1], index < window_size, header_data, backend))
+        if SEGMENT_CACHE_SETTINGS['enabled']:
+            frames[index] = frame_cache.get_image(keys[-1])
+
+    needed = [index for index, frame in enumerate(frames) if frame is None]
+    if len(needed) < len(messages):
+        print(f"Reusing {len(messages) - len(needed)} cached chat frames")
+    if not needed:
+        return frames
+
+    suspect = set()
+    if backend == 'native':
+        print("Rendering chat frames with the native renderer")
+        captured = render_chat_sequence(messages, header_data=header_data, window_size=window_size,
+                                        on_frame=on_frame, needed=needed)
+    else:
+        captured = capture_chat_sequence(messages, header_data=header_data, window_size=window_size,
+                                         on_frame=on_frame, needed=needed, suspect=suspect)
+
+    for index in needed:
+        frames[index] = captured[index]
+        # Frames taken after a failure in their window are used for this render but never cached
+        if captured[index] is not None and index not in suspect and SEGMENT_CACHE_SETTINGS['enabled']:
+            frame_cache.put_image(keys[index], captured[index])
+    return frames
+
+@timed('tts')
 def generate_audio_eleven_labs(text, voice_id, api_key):
     """Generate audio using ElevenLabs API with retry mechanism"""
     print(f"\nGenerating audio for voice_id: {voice_id}")
     
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+    # Identical text/voice/settings always produce the same clip, so serve it from disk
+    cache_key = TTSCache.make_key(text, voice_id, ELEVENLABS_MODEL_ID, VOICE_SETTINGS)
+    cached_path = tts_cache.get(cache_key)
+    if cached_path:
+        print("Using cached audio")
+        return cached_path
+    
+    url = f"{ELEVENLABS_API_BASE}/v1/text-to-speech/{voice_id}"
     
     headers = {
         "Accept": "audio/mpeg",
@@ -341,52 +449,36 @@ def generate_audio_eleven_labs(text, voice_id, api_key):
     
     data = {
         "text": text,
-        "model_id": "eleven_monolingual_v1",
+        "model_id": ELEVENLABS_MODEL_ID,
         "voice_settings": VOICE_SETTINGS
     }
     
-    max_retries = 5
-    base_delay = 3  # Start with 3 seconds delay
+    # Pacing and busy backoff are shared by every request made with this key
+    throttle = get_throttle(api_key, TTS_SETTINGS['requests_per_second'], TTS_SETTINGS['burst'])
     
-    for attempt in range(max_retries):
-        try:
-            print(f"Making API request (attempt {attempt + 1}/{max_retries})...")
-            response = requests.post(url, json=data, headers=headers)
-            
-            if response.status_code == 200:
-                temp_audio = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-                temp_files.append(temp_audio.name)
-                temp_audio.write(response.content)
-                temp_audio.close()
-                return temp_audio.name
-            
-            # If system is busy, implement exponential backoff
-            if response.status_code == 429 or "system_busy" in response.text:
-                if attempt < max_retries - 1:  # Don't sleep on the last attempt
-                    delay = base_delay * (2 ** attempt)  # Exponential backoff
-                    print(f"System busy. Retrying in {delay} seconds...")
-                    time.sleep(delay)
-                    continue
-            
-            # For other errors, raise exception immediately
-            print(f"Error response: {response.text}")
-            raise Exception(f"ElevenLabs API error: {response.text}")
-            
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)
-                print(f"Network error. Retrying in {delay} seconds...")
-                time.sleep(delay)
-                continue
-            raise Exception(f"Network error after {max_retries} attempts: {str(e)}")
+    try:
+        # 429 / system_busy responses pause all requests for this key; network errors back off
+        response = http_client.post(
+            url, 'tts', json=data, headers=headers, throttle=throttle,
+            busy=lambda response: response.status_code != 200 and "system_busy" in response.text
+        )
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Network error after {http_client.retry.max_attempts} attempts: {str(e)}")
     
-    raise Exception(f"Failed to generate audio after {max_retries} attempts. System may be too busy.")
+    if response.status_code == 200:
+        record_bytes('tts', len(response.content))
+        return tts_cache.put(cache_key, response.content)
+    
+    if response.status_code == 429 or "system_busy" in response.text:
+        raise Exception(f"Failed to generate audio after {http_client.retry.max_attempts} attempts. System may be too busy.")
+    
+    print(f"Error response: {response.text}")
+    raise Exception(f"ElevenLabs API error: {response.text}")
 
 def get_voice_ids(api_key):
     try:
         print("\nFetching voices from ElevenLabs...")
         voice_map = {}
-        headers = {"xi-api-key": api_key}
         
         # Initialize hardcoded voice IDs
         hardcoded_voices = {
@@ -397,19 +489,11 @@ def get_voice_ids(api_key):
             'laura': 'FGY2WhTYpPnrIDTdsKH5'     # Laura from your list
         }
         
-        # Get regular voices
-        response = requests.get(
-            "https://api.elevenlabs.io/v1/voices",
-            headers=headers
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"Failed to fetch voices: {response.text}")
-            
-        voices = response.json()
+        # Get regular voices (cached per API key)
+        voices = voice_catalog.voices(api_key)
         
         print("\nAvailable voices in ElevenLabs:")
-        for voice in voices["voices"]:
+        for voice in voices:
             print(f"Name: {voice['name']}, ID: {voice['voice_id']}")
             name_lower = voice['name'].lower()
             
@@ -440,7 +524,7 @@ def get_voice_ids(api_key):
         missing_voices = [voice for voice in required_voices if voice not in voice_map]
         
         if missing_voices:
-            all_voices = "\nAll available voices:\n" + "\n".join([f"- {v['name']} ({v['voice_id']})" for v in voices["voices"]])
+            all_voices = "\nAll available voices:\n" + "\n".join([f"- {v['name']} ({v['voice_id']})" for v in voices])
             raise Exception(f"Missing required voices: {', '.join(missing_voices)}.{all_voices}")
         
         return voice_map
@@ -449,7 +533,121 @@ def get_voice_ids(api_key):
         print(f"Error fetching voice IDs: {str(e)}")
         raise
 
-def generate_video(messages, header_data):
+def synthesize_all(lines, api_key, on_line=None):
+    """Synthesize (text, voice_id) pairs concurrently, returning paths in input order.
+
+    ``on_line(done, total)`` is called as each line finishes, in completion order.
+    """
+    if not lines:
+        return []
+    workers = max(1, min(TTS_SETTINGS['concurrency'], len(lines)))
+    print(f"\nSynthesizing {len(lines)} voice lines with {workers} workers...")
+    done_lock = threading.Lock()
+    done = [0]
+
+    def synthesize(line):
+        path = generate_audio_eleven_labs(line[0], line[1], api_key)
+        if on_line:
+            with done_lock:
+                done[0] += 1
+                on_line(done[0], len(lines))
+        return path
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts')
+    futures = [executor.submit(synthesize, line) for line in lines]
+    try:
+        for future in as_completed(futures):
+            future.result()
+    except Exception:
+        # The job fails on the first bad line: don't spend quota on the lines still queued
+        executor.shutdown(cancel_futures=True)
+        raise
+    executor.shutdown()
+    return [future.result() for future in futures]
+
+def build_audio_plan(messages, sender_voice_id, receiver_voice_id, api_key, on_line=None):
+    """Synthesize each message's audio once and precompute its timing.
+
+    Returns one entry per message with the decoded voice (text messages
+    only, int16 until it is mixed) and sound effect PCM and the durations
+    used for the video timeline.
+    """
+    # Synthesize all voice lines concurrently; results come back in message order
+    text_messages = [msg for msg in messages if msg.get('type') == 'text']
+    audio_paths = synthesize_all(
+        [(msg['text'], sender_voice_id if msg['is_sender'] else receiver_voice_id) for msg in text_messages],
+        api_key,
+        on_line=on_line
+    )
+    audio_path_by_message = {id(msg): path for msg, path in zip(text_messages, audio_paths)}
+
+    # Decode each voice line once, at the mix rate, in parallel ffmpeg processes. Lines are
+    # kept as int16 (half the size of float32) and converted by the mixer as it adds them.
+    with ThreadPoolExecutor(max_workers=max(1, min(os.cpu_count() or 1, len(audio_paths) or 1))) as executor:
+        voice_pcm = list(executor.map(lambda path: decode_pcm(path, sfx_bank.sample_rate, dtype='int16'),
+                                      audio_paths))
+    voice_pcm_by_path = dict(zip(audio_paths, voice_pcm))
+
+    plan = []
+    for msg in messages:
+        entry = {
+            'audio_path': None,
+            'voice_pcm': None,
+            'voice_duration': 0,
+            'effect_path': None,
+            'effect_pcm': None,
+            'effect_duration': 0,
+        }
+
+        if msg.get('soundEffect') and msg['soundEffect'] in SOUND_EFFECTS:
+            if msg['soundEffect'] in sfx_bank:
+                # Decoded once at startup; no file access per message
+                entry['effect_path'] = SOUND_EFFECTS[msg['soundEffect']]
+                entry['effect_pcm'] = sfx_bank.pcm(msg['soundEffect'])
+                entry['effect_duration'] = sfx_bank.duration(msg['soundEffect'])
+            else:
+                print(f"Warning: Sound effect '{msg['soundEffect']}' is not available, skipping it")
+
+        if msg.get('type') == 'text':
+            entry['audio_path'] = audio_path_by_message[id(msg)]
+            entry['voice_pcm'] = voice_pcm_by_path[entry['audio_path']]
+            entry['voice_duration'] = len(entry['voice_pcm']) / sfx_bank.sample_rate
+
+            if entry['effect_pcm'] is not None:
+                # Effect plays slightly before the voice
+                audio_duration = max(entry['voice_duration'] + 0.1, entry['effect_duration'])
+            else:
+                audio_duration = entry['voice_duration']
+            entry['clip_duration'] = audio_duration + 0.09  # Reduced pause between messages
+
+        else:  # Picture message, sound effect only
+            if entry['effect_pcm'] is not None:
+                audio_duration = entry['effect_duration']
+            else:
+                audio_duration = 0.5  # Default duration for picture messages
+            entry['clip_duration'] = audio_duration + 0.04
+
+        plan.append(entry)
+
+    return plan
+
+def background_start_time(header_data, background_duration, total_duration):
+    """Deterministic background offset for a story.
+
+    The offset comes from a hash of the story id the page keeps across
+    edits (falling back to the header name for clients that don't send one)
+    and the background choice, clamped so the story fits before the end of
+    the background video.
+    """
+    max_start_time = max(0, background_duration - total_duration - 1)  # -1 for safety margin
+    story = header_data.get('storyId') or header_data.get('headerName', '')
+    seed = f"{story}:{header_data.get('backgroundVideo', 'background')}"
+    fraction = int(hashlib.sha256(seed.encode('utf-8')).hexdigest()[:8], 16) / 0xFFFFFFFF
+    return min(fraction * max(0, background_duration - 1), max_start_time)
+
+@timed('generate_video')
+def generate_video(messages, header_data, workspace, progress=None):
+    progress = progress or (lambda stage, fraction=None, **details: None)
     try:
         # Get voice settings from header data
         voice_settings = header_data.get('voiceSettings', {})
@@ -459,10 +657,12 @@ def generate_video(messages, header_data):
             raise ValueError("ElevenLabs API key is required")
             
         # Fetch voice IDs
+        progress('voices', 0.02)
         voice_map = get_voice_ids(api_key)
         
         if not voice_map:
             raise ValueError("No voices found in your ElevenLabs account")
+        progress('voices', 0.05, found=len(voice_map))
         
         # Map 'male'/'female' to specific voices
         gender_to_voice = {
@@ -490,231 +690,144 @@ def generate_video(messages, header_data):
         
         print(f"Using voice IDs - Sender: {sender_voice_id}, Receiver: {receiver_voice_id}")
         
-        # Cloudinary video URLs (updated with working URLs)
-        CLOUDINARY_VIDEOS = {
-            'background': 'https://res.cloudinary.com/dokndhglh/video/upload/c_scale,h_1080,q_100/v1739342327/h3mqdaupaop1eprdcld3.mp4',
-            'background_1': 'https://res.cloudinary.com/dokndhglh/video/upload/c_scale,h_1080,q_100/v1739342660/f1bhluhc6si77uapdawe_slowed_oq2v20.mp4',
-            'background_2': 'https://res.cloudinary.com/dokndhglh/video/upload/c_scale,h_1080,q_100/v1739343309/dxo2rlb7kckps0fnfvv4_slowed_mmptbq.mp4',
-            'background_3': 'https://res.cloudinary.com/dokndhglh/video/upload/c_scale,h_1080,q_100/v1739343390/pytgss2oi9idgch1xhrw_slowed_ku8hde.mp4',
-            'background_4': 'https://res.cloudinary.com/dokndhglh/video/upload/v1739599641/Minecraft_Jump_and_Run_Gameplay_TIKTOK_Format_60fps_1440p_HD_No_Ads_No_Credits_3_-_Minecraft_Gameplay_1080p_h264_mute_youtube_online-video-cutter.com_1_eprmyf.mp4'
-        }
-        
         # Get the selected background video
         selected_bg = header_data.get('backgroundVideo', 'background')
-        bg_url = CLOUDINARY_VIDEOS.get(selected_bg)
+        bg_url = background_store.sources.get(selected_bg)
         
         if not bg_url:
             raise ValueError(f"Invalid background video: {selected_bg}")
 
-        print(f"Downloading background video from: {bg_url}")
-        
-        # Download the video using requests with retry logic
-        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_video:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            # Attempt the download up to 3 times
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    response = requests.get(bg_url, stream=True, headers=headers, timeout=30)
-                    response.raise_for_status()
-                    
-                    total_size = int(response.headers.get('content-length', 0))
-                    block_size = 8192
-                    downloaded = 0
-                    
-                    for chunk in response.iter_content(chunk_size=block_size):
-                        if chunk:
-                            downloaded += len(chunk)
-                            temp_video.write(chunk)
-                            if total_size > 0:
-                                percent = (downloaded / total_size) * 100
-                                print(f"\rDownloading background video: {percent:.1f}%", end='')
-                    
-                    print("\nDownload completed successfully")
-                    break
-                except requests.exceptions.RequestException as e:
-                    print(f"Attempt {attempt + 1} failed: {str(e)}")
-                    if attempt == max_retries - 1:
-                        raise Exception(f"Failed to download video after {max_retries} attempts: {str(e)}")
-                    print("Retrying download...")
-                    time.sleep(5)
-            
-            temp_video_path = temp_video.name
-            temp_files.append(temp_video_path)
+        # Local copy shared by all jobs (fetched once, validated before use)
+        background_path = background_store.path_for(selected_bg)
 
-        # Load the background video and get its duration
-        background = VideoFileClip(temp_video_path, audio=False)
-        
-        # Calculate total duration needed for all messages
-        video_clips = []
-        audio_clips = []
-        total_duration = 0
-        
-        # First pass to calculate total duration needed
-        for i in range(0, len(messages), 5):
-            sequence = messages[i:i+5]
-            for j in range(len(sequence)):
-                msg = sequence[j]
-                if msg.get('type') == 'text':
-                    # Estimate audio duration
-                    voice_id = sender_voice_id if msg['is_sender'] else receiver_voice_id
-                    audio_path = generate_audio_eleven_labs(msg['text'], voice_id, api_key)
-                    voice_audio = AudioFileClip(audio_path)
-                    
-                    if msg.get('soundEffect') and msg['soundEffect'] in SOUND_EFFECTS:
-                        effect_audio = AudioFileClip(SOUND_EFFECTS[msg['soundEffect']])
-                        clip_duration = max(voice_audio.duration + 0.1, effect_audio.duration)
-                    else:
-                        clip_duration = voice_audio.duration
-                        
-                    total_duration += clip_duration + 0.09
-                else:  # Picture message
-                    if msg.get('soundEffect') and msg['soundEffect'] in SOUND_EFFECTS:
-                        effect_audio = AudioFileClip(SOUND_EFFECTS[msg['soundEffect']])
-                        total_duration += effect_audio.duration + 0.04
-                    else:
-                        total_duration += 0.54  # Default duration for picture messages
-
-        # Choose a random start point that ensures we have enough video duration
-        max_start_time = max(0, background.duration - total_duration - 1)  # -1 for safety margin
-        if max_start_time > 0:
-            start_time = np.random.uniform(0, max_start_time)
-            print(f"\nChose random start time: {start_time:.2f} seconds")
-            background = background.subclip(start_time)
-        
+        # Probe the background; only the segment we use gets decoded later
+        background = probe_video(background_path)
+
+        # The quality tier decides resolution, fps, encoder settings and which renditions are made
+        settings = quality_settings(header_data.get('quality'))
+        canvas_width, canvas_height = canvas_size((background['width'], background['height']), settings)
+        print(f"Quality tier: {settings['quality']} ({canvas_width}x{canvas_height} canvas, "
+              f"{settings['height']}p/{settings['fps']} fps output)")
+        
+        # Synthesize every voice line once and work out the timeline
+        progress('tts', 0.1)
+        audio_plan = build_audio_plan(
+            messages, sender_voice_id, receiver_voice_id, api_key,
+            on_line=lambda done, total: progress('tts', 0.1 + 0.2 * done / total, done=done, total=total)
+        )
+        total_duration = sum(entry['clip_duration'] for entry in audio_plan)
+
+        # Pick a start point that leaves enough video duration. It is derived from the story
+        # (not random per render) so re-rendering an edited story can reuse cached segments.
+        start_time = background_start_time(header_data, background['duration'], total_duration)
+        print(f"\nChose start time: {start_time:.2f} seconds")
+        
+        # Render every chat state up front (one browser session or the native renderer)
+        progress('capture', 0.3)
+        frames = capture_chat_frames(
+            messages, header_data=header_data,
+            on_frame=lambda done, total: progress('capture', 0.3 + 0.15 * done / total, done=done, total=total)
+        )
+
+        # Lay out one overlay per message state
+        timeline = []
         current_time = 0
-        message_count = 0
+        for index, (entry, current_image) in enumerate(zip(audio_plan, frames)):
+            clip_duration = entry['clip_duration']
 
-        # Process messages in sequences of 5
-        for i in range(0, len(messages), 5):
-            sequence = messages[i:i+5]
-            
-            for j in range(len(sequence)):
-                current_window = sequence[:j+1]
-                message_count += 1
-                
-                msg = sequence[j]
-                
-                # Handle text messages with voice over
-                if msg.get('type') == 'text':
-                    voice_id = sender_voice_id if msg['is_sender'] else receiver_voice_id
-                    audio_path = generate_audio_eleven_labs(msg['text'], voice_id, api_key)
-                    voice_audio = AudioFileClip(audio_path)
-                    
-                    # Add sound effect if specified
-                    if msg.get('soundEffect') and msg['soundEffect'] in SOUND_EFFECTS:
-                        print(f"Adding sound effect: {msg['soundEffect']}")
-                        effect_audio = AudioFileClip(SOUND_EFFECTS[msg['soundEffect']])
-                        # Combine voice and effect (effect plays slightly before voice)
-                        combined_audio = CompositeAudioClip([
-                            effect_audio.with_start(0),
-                            voice_audio.with_start(0.1)  # Slight delay for voice
-                        ])
-                        audio_duration = max(voice_audio.duration + 0.1, effect_audio.duration)
-                    else:
-                        combined_audio = voice_audio
-                        audio_duration = voice_audio.duration
-                    
-                    clip_duration = audio_duration + 0.09  # Reduced pause between messages
-                
-                # Handle picture messages with sound effects only
-                elif msg.get('type') == 'picture':
-                    if msg.get('soundEffect') and msg['soundEffect'] in SOUND_EFFECTS:
-                        print(f"Adding sound effect: {msg['soundEffect']}")
-                        effect_audio = AudioFileClip(SOUND_EFFECTS[msg['soundEffect']])
-                        combined_audio = effect_audio
-                        audio_duration = effect_audio.duration
-                    else:
-                        combined_audio = None
-                        audio_duration = 0.5  # Default duration for picture messages
-                    
-                    clip_duration = audio_duration + 0.04
-                
-                # Show header only for the first five messages
-                show_header = (message_count <= 5)
-                
-                # Capture current chat interface
-                current_image = capture_chat_interface(current_window, show_header=show_header, header_data=header_data)
-                if current_image is None:
-                    print(f"Failed to capture chat interface for message {i + 1}")
-                    continue
+            # Chat state for the current window (header only shown for the first five messages)
+            if current_image is None:
+                print(f"Failed to capture chat interface for message {index + 1}")
+                continue
 
-                # Resize image to fit the background
-                target_width = int(background.w * 0.85)
-                width_scale = target_width / current_image.width
-                new_height = int(current_image.height * width_scale)
-                current_image = current_image.resize((target_width, new_height), Image.LANCZOS)
-                current_array = np.array(current_image)
+            # Resize image to fit the background
+            target_width = int(canvas_width * 0.85)
+            width_scale = target_width / current_image.width
+            new_height = int(current_image.height * width_scale)
+            current_image = current_image.resize((target_width, new_height), Image.LANCZOS)
 
-                # Calculate position to center
-                x_center = background.w // 2 - target_width // 2
-                y_top = background.h // 8  # Position moved higher
-                
-                # Create clip for current message state
-                current_clip = (ImageClip(current_array)
-                                .with_duration(clip_duration)
-                                .with_position((x_center, y_top)))
-                
-                video_clips.append(current_clip.with_start(current_time))
-                if combined_audio:
-                    audio_clips.append(combined_audio.with_start(current_time))
+            # Calculate position to center
+            x_center = canvas_width // 2 - target_width // 2
+            y_top = canvas_height // 8  # Position moved higher
 
-                current_time += clip_duration
+            timeline.append({
+                'index': index,
+                'image': current_image,
+                'position': (x_center, y_top),
+                'start': current_time,
+                'duration': clip_duration,
+                'audio': entry,
+            })
+            current_time += clip_duration
 
-        if not video_clips:
+        if not timeline:
             raise Exception("No valid messages to generate video.")
 
-        if current_time > background.duration:
-            n_loops = int(np.ceil(current_time / background.duration))
-            bg_clips = [background] * n_loops
-            background_extended = concatenate_videoclips(bg_clips)
-            background_extended = background_extended.subclipped(0, current_time)
-        else:
-            background_extended = background.subclipped(0, current_time)
-
-        final = CompositeVideoClip(
-            [background_extended] + video_clips,
-            size=background_extended.size
-        )
+        # One composition pass feeds every rendition at the final resolution and codec settings
+        progress('composing', 0.45)
+        outputs = {'original': workspace.path("output_video.mp4")}
+        if settings['spedup']:
+            outputs['spedup'] = workspace.path("spedup_outputvideo.mp4")
+        on_progress = lambda fraction: progress('composing', 0.45 + 0.4 * fraction, percent=round(fraction * 100, 1))
+        on_pass = lambda name, **details: progress('encoding', None, encode_pass=name, **details)
+        compositor = header_data.get('compositor') or COMPOSITOR
 
-        if audio_clips:
-            final = final.with_audio(CompositeAudioClip(audio_clips))
-
-        output_path = "output_video.mp4"
-        final.write_videofile(output_path, 
-                            fps=60,                    # Increased to 60fps for smoothness
-                            codec='libx264',
-                            audio_codec='aac',
-                            bitrate="20000k",          # Increased bitrate for quality
-                            preset='slow',             # 'slow' gives better quality than 'slower'
-                            threads=4,
-                            audio_bitrate="320k",      # Higher audio quality
-                            ffmpeg_params=[
-                                '-crf', '17',          # Lower CRF for higher quality (17-18 is very high quality)
-                                '-pix_fmt', 'yuv420p', # Best compatibility
-                                '-profile:v', 'high',  # High profile for better quality
-                                '-movflags', '+faststart'
-                            ])
+        # The whole soundtrack is mixed once (voice 0.1 s after its effect) and encoded as one stream
+        on_pass('audio', duration=round(current_time, 3))
+        audio_path = mix_timeline(timeline, current_time, sfx_bank.sample_rate, workspace.path('timeline_audio.wav'))
+
+        if compositor == 'ffmpeg':
+            segment_info = {
+                'path': background_path,
+                'start': start_time,
+                'looped': start_time + current_time > background['duration'],
+                'size': (canvas_width, canvas_height),
+                'source_size': (background['width'], background['height']),
+            }
+            compose_with_ffmpeg(segment_info, timeline, audio_path, current_time, outputs, workspace,
+                                settings=settings, on_progress=on_progress, on_pass=on_pass)
+            return outputs
+
+        if compositor == 'segmented':
+            # Long stories: composite and encode slices of the timeline on every core
+            # Edited stories reuse every cached segment whose content, timing and background offset match
+            segment_info = {
+                'id': f"{selected_bg}:{bg_url}",
+                'path': background_path,
+                'start': start_time,
+                'size': (canvas_width, canvas_height),
+            }
+            encode_segmented(segment_info, timeline, audio_path,
+                             current_time, outputs, workspace, settings=settings,
+                             on_progress=on_progress, on_pass=on_pass,
+                             cache=segment_cache if SEGMENT_CACHE_SETTINGS['enabled'] else None)
+            return outputs
+
+        # Decode just [start_time, start_time + current_time], looping if the file is too short
+        background_segment = BackgroundSegment(background_path, start_time, current_time, fps=settings['fps'],
+                                               size=(canvas_width, canvas_height))
+        print(f"Background decode range: {background_segment.decode_range()}")
+
+        # Overlays are still images: each is premultiplied when it appears and blended only inside its bounding box
+        size = (canvas_width, canvas_height)
+        overlays = [OverlaySpec(item['image'], item['position'], item['start'], item['duration'])
+                    for item in timeline]
+        compositor = StaticOverlayCompositor(background_segment.get_frame, size, overlays)
+        final = VideoClip(frame_function=compositor.frame_at, duration=current_time)
+
+        try:
+            encode_renditions(final, outputs, workspace, settings=settings, on_progress=on_progress, on_pass=on_pass,
+                              audio_path=audio_path)
+        finally:
+            background_segment.close()
         
-        return output_path
+        return outputs
         
     except Exception as e:
         print(f"Error generating video: {str(e)}")
         traceback.print_exc()
         raise
 
-def cleanup_temp_files():
-    for file_path in temp_files:
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                print(f"Cleaned up temporary file: {file_path}")
-        except Exception as e:
-            print(f"Warning: Error cleaning up {file_path}: {e}")
-
 def log_video_info(video_path):
     try:
         size_mb = os.path.getsize(video_path) / (1024 * 1024)
@@ -738,13 +851,12 @@ def validate_key():
         if not api_key:
             return jsonify({'error': 'API key is required'}), 400
             
-        # Test the API key with ElevenLabs
-        response = requests.get(
-            "https://api.elevenlabs.io/v1/voices",
-            headers={"xi-api-key": api_key}
-        )
-        
-        if response.status_code != 200:
+        # Test the API key with ElevenLabs (a recent answer for this key is reused)
+        try:
+            voice_catalog.voices(api_key)
+        except VoiceListError as e:
+            if e.status_code is None:
+                raise
             return jsonify({'error': 'Invalid API key'}), 401
             
         return jsonify({'status': 'success', 'message': 'API key is valid'})
@@ -752,11 +864,126 @@ def validate_key():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def build_header_data(data):
+    """Header data dictionary passed through the render pipeline"""
+    return {
+        'profileImage': data.get('profileImage', ''),
+        'headerName': data.get('headerName', 'John Doe'),
+        'storyId': data.get('storyId'),
+        'voiceSettings': data.get('voiceSettings', {}),
+        'backgroundVideo': data.get('backgroundVideo', 'background'),
+        'theme': data.get('theme', 'light'),
+        'renderBackend': data.get('renderBackend'),
+        'compositor': data.get('compositor'),
+        'quality': data.get('quality')
+    }
+
+def run_generation(data, progress=None):
+    """Render both renditions and upload them for one request; returns the response data.
+
+    ``progress(stage, fraction, **details)`` is called as the pipeline moves between
+    stages and as TTS lines, captured frames and encoded frames complete.
+    """
+    progress = progress or (lambda stage, fraction=None, **details: None)
+    messages = data['messages']
+    header_data = build_header_data(data)
+    
+    if not header_data['voiceSettings'].get('apiKey'):
+        raise ValueError("ElevenLabs API key is required")
+    quality_settings(header_data['quality'])   # Reject an unknown tier before doing any work
+    
+    # Every intermediate file lives in this job's workspace, removed on success or failure
+    # Peak RSS is sampled for the whole job, including uploads
+    with track_peak_rss(), workspace_manager.create() as workspace:
+        return _run_generation_in_workspace(messages, header_data, workspace, progress)
+
+def _run_generation_in_workspace(messages, header_data, workspace, progress):
+    # Render every rendition of the quality tier (original, and sped-up unless drafting) in one pass
+    print("\nGenerating video...")
+    renditions = generate_video(messages, header_data, workspace, progress=progress)
+    video_path = renditions['original']
+    spedup_path = renditions.get('spedup')
+    log_video_info(video_path)
+    for path in renditions.values():
+        record_file_bytes('encode', path)
+    
+    # Both renditions upload concurrently on the shared uploader's threads
+    print("\nUploading video to Google Drive...")
+    progress('uploading', 0.85, rendition='original', size_bytes=os.path.getsize(video_path))
+    original_upload = drive_uploader.submit(upload_to_drive, video_path, 'output_video.mp4')
+    spedup_upload = None
+    if spedup_path:
+        print("\nUploading sped-up video to Google Drive...")
+        progress('uploading', 0.86, rendition='spedup', size_bytes=os.path.getsize(spedup_path))
+        spedup_upload = drive_uploader.submit(upload_to_drive, spedup_path, 'spedup_outputvideo.mp4')
+
+    drive_result = original_upload.result()
+    if not drive_result:
+        if spedup_upload and not spedup_upload.cancel():
+            spedup_upload.result()   # Don't remove the workspace under a running upload
+        raise Exception("Failed to upload video to Google Drive")
+    progress('uploaded', 0.9, rendition='original', file_id=drive_result.get('id', ''),
+             throughput=drive_result.get('throughput'))
+    
+    # Initialize response data
+    response_data = {
+        'status': 'success',
+        'message': 'Video generated and processed successfully',
+        'original_video_id': drive_result.get('id', ''),
+        'original_video_link': f"https://drive.google.com/file/d/{drive_result.get('id', '')}/view?usp=drivesdk",
+        'spedup_video_id': '',
+        'spedup_video_link': '',
+        'quality': quality_settings(header_data.get('quality'))['quality']
+    }
+
+    # Draft previews have no sped-up rendition and are not announced
+    if not spedup_path:
+        print("\nProcess completed successfully!")
+        return response_data
+
+    try:
+        spedup_drive_result = spedup_upload.result()
+        if not spedup_drive_result:
+            raise Exception("Upload to Google Drive failed")
+        progress('uploaded', 0.98, rendition='spedup', file_id=spedup_drive_result.get('id', ''),
+                 throughput=spedup_drive_result.get('throughput'))
+        
+        response_data.update({
+            'spedup_video_id': spedup_drive_result.get('id', ''),
+            'spedup_video_link': f"https://drive.google.com/file/d/{spedup_drive_result.get('id', '')}/view?usp=drivesdk"
+        })
+        
+        # Handle Discord webhook if URL is provided
+        discord_webhook_url = os.environ.get('DISCORD_WEBHOOK_URL')
+        if discord_webhook_url:
+            try:
+                # Send original video link
+                webhook_data = {
+                    'content': f"🎥 **New video generated by {header_data['headerName']}**\n\n" \
+                             f"📝 **Original Video**\n" \
+                             f"🔗 Drive Link: {drive_result['link']}\n\n" \
+                             f"⏱️ **Sped-up Version (1.75x)**\n" \
+                             f"🔗 Drive Link: {spedup_drive_result['link']}"
+                }
+                
+                response = http_client.post(discord_webhook_url, 'discord_webhook', json=webhook_data)
+                if response.status_code != 204:
+                    print(f"Warning: Discord webhook returned status code {response.status_code}")
+                    
+            except Exception as webhook_error:
+                print(f"Warning: Error sending to Discord webhook: {str(webhook_error)}")
+                
+    except Exception as e:
+        print(f"Error uploading sped-up video: {str(e)}")
+        response_data['message'] = f"Video generated but sped-up upload failed: {str(e)}"
+
+    print("\nProcess completed successfully!")
+    return response_data
+
 @app.route('/api/generate', methods=['POST'])
 def generate_endpoint():
     try:
         data = request.json
-        messages = data['messages']
         
         # Get voice settings and validate API key
         voice_settings = data.get('voiceSettings', {})
@@ -767,104 +994,13 @@ def generate_endpoint():
                 'status': 'error',
                 'error': 'ElevenLabs API key is required'
             }), 400
-        
-        # Create header_data dictionary
-        header_data = {
-            'profileImage': data.get('profileImage', ''),
-            'headerName': data.get('headerName', 'John Doe'),
-            'voiceSettings': voice_settings,
-            'backgroundVideo': data.get('backgroundVideo', 'background'),
-            'theme': data.get('theme', 'light')
-        }
-        
-        # Generate the initial video
-        print("\nGenerating initial video...")
-        video_path = generate_video(messages, header_data)
-        log_video_info(video_path)
-        
-        # Enhance video quality using AI
-        print("\nEnhancing video quality with AI...")
-        enhanced_video_path = "enhanced_" + os.path.basename(video_path)
-        if enhance_video_quality(video_path, enhanced_video_path):
-            print("Using AI-enhanced video for further processing")
-            # Replace original video with enhanced version
-            shutil.move(enhanced_video_path, video_path)
-        else:
-            print("Warning: AI enhancement failed, using original video")
-        
-        # Upload original video to Google Drive
-        print("\nUploading enhanced video to Google Drive...")
-        drive_result = upload_to_drive(video_path, 'output_video.mp4')
-        
-        # Initialize response data
-        response_data = {
-            'status': 'success',
-            'message': 'Video generated, enhanced, and processed successfully',
-            'original_video_id': drive_result.get('id', ''),
-            'original_video_link': f"https://drive.google.com/file/d/{drive_result.get('id', '')}/view?usp=drivesdk",
-            'spedup_video_id': '',
-            'spedup_video_link': ''
-        }
 
-        # Run the speed-up script
         try:
-            print("\nStarting video speed-up process...")
-            subprocess.run(['python', 'speed_up_video.py'], check=True)
-            
-            if os.path.exists('spedup_outputvideo.mp4'):
-                # Enhance the sped-up video as well
-                print("\nEnhancing sped-up video quality with AI...")
-                enhanced_spedup_path = "enhanced_spedup_outputvideo.mp4"
-                if enhance_video_quality('spedup_outputvideo.mp4', enhanced_spedup_path):
-                    print("Using AI-enhanced sped-up video")
-                    shutil.move(enhanced_spedup_path, 'spedup_outputvideo.mp4')
-                else:
-                    print("Warning: AI enhancement of sped-up video failed, using original")
-                
-                print("\nUploading enhanced sped-up video to Google Drive...")
-                spedup_drive_result = upload_to_drive('spedup_outputvideo.mp4', 'spedup_outputvideo.mp4')
-                
-                response_data.update({
-                    'spedup_video_id': spedup_drive_result.get('id', ''),
-                    'spedup_video_link': f"https://drive.google.com/file/d/{spedup_drive_result.get('id', '')}/view?usp=drivesdk"
-                })
-                
-                # Handle Discord webhook if URL is provided
-                discord_webhook_url = os.environ.get('DISCORD_WEBHOOK_URL')
-                if discord_webhook_url:
-                    try:
-                        # Send original video link
-                        webhook_data = {
-                            'content': f"🎥 **New video generated by {header_data['headerName']}**\n\n" \
-                                     f"📝 **Original Video**\n" \
-                                     f"🔗 Drive Link: {drive_result['link']}\n\n" \
-                                     f"⏱️ **Sped-up Version (1.75x)**\n" \
-                                     f"🔗 Drive Link: {spedup_drive_result['link']}"
-                        }
-                        
-                        response = requests.post(discord_webhook_url, json=webhook_data)
-                        if response.status_code != 204:
-                            print(f"Warning: Discord webhook returned status code {response.status_code}")
-                            
-                    except Exception as webhook_error:
-                        print(f"Warning: Error sending to Discord webhook: {str(webhook_error)}")
-                
-                # Clean up temporary files
-                try:
-                    if os.path.exists('output_video.mp4'):
-                        os.remove('output_video.mp4')
-                    if os.path.exists('spedup_outputvideo.mp4'):
-                        os.remove('spedup_outputvideo.mp4')
-                    print("\nTemporary files cleaned up")
-                except Exception as e:
-                    print(f"Warning: Error cleaning up temporary files: {str(e)}")
-                    
-        except Exception as e:
-            print(f"Error in speed-up process: {str(e)}")
-            response_data['message'] = f"Video generated and enhanced but speed-up failed: {str(e)}"
-
-        print("\nProcess completed successfully!")
-        return jsonify(response_data)
+            quality_settings(data.get('quality'))
+        except ValueError as e:
+            return jsonify({'status': 'error', 'error': str(e)}), 400
+        
+        return jsonify(run_generation(data))
 
     except Exception as e:
         print(f"Error in generate endpoint: {str(e)}")
@@ -874,6 +1010,116 @@ def generate_endpoint():
             'message': str(e)
         }), 500
 
+# Background rendering: jobs are persisted in SQLite and run by a bounded worker pool
+job_store = JobStore(JOB_SETTINGS['db_path'])
+job_runner = JobRunner(job_store, run_generation,
+                       workers=JOB_SETTINGS['workers'],
+                       queue_size=JOB_SETTINGS['queue_size'],
+                       owner_ttl=JOB_SETTINGS['owner_ttl'],
+                       recover_interval=JOB_SETTINGS['recover_interval'],
+                       max_attempts=JOB_SETTINGS['max_attempts'],
+                       broker=progress_broker)
+job_runner.start()
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    try:
+        data = request.json
+        
+        if not data.get('voiceSettings', {}).get('apiKey'):
+            return jsonify({
+                'status': 'error',
+                'error': 'ElevenLabs API key is required'
+            }), 400
+
+        try:
+            quality_settings(data.get('quality'))
+        except ValueError as e:
+            return jsonify({'status': 'error', 'error': str(e)}), 400
+        
+        job_id = job_runner.submit(data)
+        return jsonify({
+            'status': 'queued',
+            'job_id': job_id,
+            'status_url': f"/api/jobs/{job_id}",
+            'events_url': f"/api/jobs/{job_id}/events"
+        }), 202
+        
+    except QueueFull as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error creating job: {str(e)}")
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    job = job_store.get(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'error': 'Job not found'}), 404
+    
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'progress': job['progress'],
+        'result': job['result'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at']
+    })
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent Events stream of a job's progress, ending with a done or failed event"""
+    job = job_store.get(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'error': 'Job not found'}), 404
+
+    if job['status'] in ('done', 'failed') and not progress_broker.has_job(job_id):
+        # The event buffer has expired (or the job ran in an earlier process): replay the outcome
+        progress_broker.close(job_id, job['status'], job['progress'], result=job['result'], error=job['error'])
+
+    # EventSource sends the last id it saw when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_id = int(last_event_id) if last_event_id.isdigit() else 0
+
+    return Response(
+        # Jobs run by another worker (or awaiting recovery) are followed through the job store
+        stream_with_context(progress_broker.stream(job_id, last_id, heartbeat=PROGRESS_SETTINGS['heartbeat'],
+                                                   load_job=lambda: job_store.get(job_id),
+                                                   poll_interval=PROGRESS_SETTINGS['poll_interval'])),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Cache statistics are read at scrape time rather than on every lookup
+cache_lookups = metrics_registry.gauge('cache_lookups', 'Cache lookups since start by result')
+cache_hit_ratio = metrics_registry.gauge('cache_hit_ratio', 'Fraction of cache lookups that were hits')
+
+@metrics_registry.collector
+def collect_cache_metrics():
+    stats = tts_cache.stats()
+    cache_lookups.set(stats['hits'], cache='tts', result='hit')
+    cache_lookups.set(stats['misses'], cache='tts', result='miss')
+    cache_lookups.set(stats['evictions'], cache='tts', result='eviction')
+    cache_hit_ratio.set(stats['hit_ratio'], cache='tts')
+
+    stats = voice_catalog.stats()
+    cache_lookups.set(stats['hits'], cache='voices', result='hit')
+    cache_lookups.set(stats['misses'], cache='voices', result='miss')
+    cache_hit_ratio.set(stats['hit_ratio'], cache='voices')
+
+    stats = search_cache.stats()
+    cache_lookups.set(stats['hits'], cache='image_search', result='hit')
+    cache_lookups.set(stats['misses'], cache='image_search', result='miss')
+    cache_lookups.set(stats['evictions'], cache='image_search', result='eviction')
+    cache_lookups.set(stats['prefetches'], cache='image_search', result='prefetch')
+    cache_hit_ratio.set(stats['hit_ratio'], cache='image_search')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/fetch-voices', methods=['POST'])
 def fetch_voices():
     try:
@@ -883,75 +1129,99 @@ def fetch_voices():
         if not api_key:
             return jsonify({'error': 'API key is required'}), 400
             
-        response = requests.get(
-            "https://api.elevenlabs.io/v1/voices",
-            headers={"xi-api-key": api_key}
-        )
-        
-        if response.status_code != 200:
-            return jsonify({'error': 'Failed to fetch voices'}), response.status_code
+        try:
+            voices = voice_catalog.voices(api_key)
+        except VoiceListError as e:
+            if e.status_code is None:
+                raise
+            return jsonify({'error': 'Failed to fetch voices'}), e.status_code
             
-        voices = response.json()
         voice_list = [{'name': voice['name'], 'id': voice['voice_id']} 
-                     for voice in voices['voices']]
+                     for voice in voices]
                      
         return jsonify(voice_list)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Values accepted by Google Custom Search for the image filters the endpoint exposes
+IMAGE_SEARCH_SAFE = ('active', 'off')
+IMAGE_SEARCH_SIZES = ('icon', 'small', 'medium', 'large', 'xlarge', 'xxlarge', 'huge')
+
+def fetch_image_search(query, page, safe, img_size):
+    """One page of image results shaped for the front end, or None if there are none"""
+    # Calculate start index for pagination (1, 11, 21, etc.)
+    # Google CSE allows max 10 results per request
+    start_index = (page - 1) * 10 + 1
+
+    # Make request to Google Custom Search API
+    url = 'https://www.googleapis.com/customsearch/v1'
+    params = {
+        'key': GOOGLE_API_KEY,
+        'cx': GOOGLE_CSE_ID,
+        'q': query,
+        'searchType': 'image',
+        'num': 10,  # Maximum allowed by Google CSE
+        'start': start_index,
+        'imgSize': img_size,
+        'safe': safe
+    }
+
+    response = http_client.get(url, 'image_search', params=params)
+    data = response.json()
+
+    if response.status_code != 200 or 'items' not in data:
+        return None
+
+    # Extract relevant image information
+    images = [{
+        'url': item['link'],
+        'title': item['title'],
+        'thumbnail': item.get('image', {}).get('thumbnailLink', item['link']),
+        'context': item.get('image', {}).get('contextLink', ''),  # Add source context
+        'height': item.get('image', {}).get('height', ''),
+        'width': item.get('image', {}).get('width', '')
+    } for item in data['items']]
+
+    # Add pagination info
+    return {
+        'images': images,
+        'currentPage': page,
+        'hasMore': 'queries' in data and 'nextPage' in data['queries'],
+        'totalResults': min(int(data.get('searchInformation', {}).get('totalResults', 0)), 100)  # Google CSE limits to 100
+    }
+
 @app.route('/api/search-images')
 def search_images():
     try:
         query = request.args.get('q')
-        page = request.args.get('page', '1')  # Get page number, default to 1
+        page = int(request.args.get('page', '1'))  # Get page number, default to 1
+        safe = request.args.get('safe', 'active')  # Safe search setting
+        img_size = request.args.get('imgSize', 'medium')  # Get medium sized images
         
         if not query:
             return jsonify({'error': 'Query parameter is required'}), 400
+        if safe not in IMAGE_SEARCH_SAFE or img_size not in IMAGE_SEARCH_SIZES:
+            return jsonify({'error': 'Invalid safe or imgSize parameter'}), 400
 
         if not GOOGLE_API_KEY or not GOOGLE_CSE_ID:
             return jsonify({'error': 'Google API configuration is missing'}), 500
 
-        # Calculate start index for pagination (1, 11, 21, etc.)
-        # Google CSE allows max 10 results per request
-        start_index = (int(page) - 1) * 10 + 1
-
-        # Make request to Google Custom Search API
-        url = 'https://www.googleapis.com/customsearch/v1'
-        params = {
-            'key': GOOGLE_API_KEY,
-            'cx': GOOGLE_CSE_ID,
-            'q': query,
-            'searchType': 'image',
-            'num': 10,  # Maximum allowed by Google CSE
-            'start': start_index,
-            'imgSize': 'medium',  # Get medium sized images
-            'safe': 'active'  # Safe search setting
-        }
-
-        response = requests.get(url, params=params)
-        data = response.json()
+        # Repeated queries and pages are served from memory
+        response_data = search_cache.get_or_fetch(
+            SearchCache.make_key(query, page, safe, img_size),
+            lambda: fetch_image_search(query, page, safe, img_size)
+        )
 
-        if 'items' not in data:
+        if not response_data:
             return jsonify({'error': 'No images found'}), 404
 
-        # Extract relevant image information
-        images = [{
-            'url': item['link'],
-            'title': item['title'],
-            'thumbnail': item.get('image', {}).get('thumbnailLink', item['link']),
-            'context': item.get('image', {}).get('contextLink', ''),  # Add source context
-            'height': item.get('image', {}).get('height', ''),
-            'width': item.get('image', {}).get('width', '')
-        } for item in data['items']]
-
-        # Add pagination info
-        response_data = {
-            'images': images,
-            'currentPage': int(page),
-            'hasMore': 'queries' in data and 'nextPage' in data['queries'],
-            'totalResults': min(int(data.get('searchInformation', {}).get('totalResults', 0)), 100)  # Google CSE limits to 100
-        }
+        # Users page forward, so have the next page ready before it is asked for
+        if response_data['hasMore'] and SEARCH_CACHE_SETTINGS['prefetch']:
+            search_cache.prefetch(
+                SearchCache.make_key(query, page + 1, safe, img_size),
+                lambda: fetch_image_search(query, page + 1, safe, img_size)
+            )
 
         return jsonify(response_data)
 
@@ -959,71 +1229,6 @@ def search_images():
         print(f"Error in image search: {str(e)}")
         return jsonify({'error': 'Failed to search images'}), 500
 
-def enhance_video_quality(input_path, output_path):
-    """Optimize video quality while maintaining clarity and sharpness"""
-    try:
-        print("\nOptimizing video quality...")
-        
-        # Extract video info
-        probe_cmd = [
-            'ffprobe',
-            '-v', 'error',
-            '-select_streams', 'v:0',
-            '-show_entries', 'stream=width,height,r_frame_rate',
-            '-of', 'json',
-            input_path
-        ]
-        
-        probe_result = subprocess.run(probe_cmd, capture_output=True, text=True)
-        video_info = json.loads(probe_result.stdout)
-        
-        # Calculate target resolution (1080p)
-        target_height = 1080
-        current_height = int(video_info['streams'][0]['height'])
-        scale_factor = target_height / current_height
-        
-        # Calculate target width and ensure it's even
-        raw_target_width = int(int(video_info['streams'][0]['width']) * scale_factor)
-        target_width = raw_target_width + (raw_target_width % 2)  # Make sure width is even
-        
-        print(f"Processing video to {target_width}x{target_height}")
-        
-        # Simple, high-quality scaling without aggressive filters
-        complex_filter = (
-            f"scale={target_width}:{target_height}:flags=lanczos"
-        )
-        
-        # High quality encoding settings focused on preserving quality
-        enhance_cmd = [
-            'ffmpeg',
-            '-i', input_path,
-            '-vf', complex_filter,
-            '-c:v', 'libx264',
-            '-preset', 'medium',     # Balance between quality and speed
-            '-crf', '18',           # High quality, visually lossless
-            '-maxrate', '15M',
-            '-bufsize', '15M',
-            '-profile:v', 'high',
-            '-level', '4.1',
-            '-movflags', '+faststart',
-            '-c:a', 'aac',
-            '-b:a', '256k',
-            '-ar', '48000',
-            '-y',
-            output_path
-        ]
-        
-        print("\nProcessing video with optimized settings...")
-        subprocess.run(enhance_cmd, check=True)
-        
-        print("Video processing completed successfully!")
-        return True
-        
-    except Exception as e:
-        print(f"Error during video processing: {str(e)}")
-        traceback.print_exc()
-        return False
-
 if __name__ == '__main__':
     # Run Flask on all interfaces with port 8080 for Google Cloud
     app.run(debug=True, host='0.0.0.0', port=8080)
\ No newline at end of file
@@ -0,0 +1,77 @@
+import math
+import wave
+import numpy as np
+
+class AudioMixer:
+    """Mixes a whole story's audio into one preallocated PCM buffer.
+
+    Each clip is added once with a NumPy slice-add at its sample offset, so
+    the cost is linear in the number of samples regardless of how many
+    clips overlap. The mix is float32 of shape (samples, channels); clips
+    may be float32 or int16, which is scaled to float one clip at a time.
+    """
+
+    def __init__(self, duration, sample_rate, channels=2):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.buffer = np.zeros((int(math.ceil(duration * sample_rate)), channels), dtype=np.float32)
+
+    def add(self, pcm, start):
+        """Add ``pcm`` starting at ``start`` seconds; anything past the end is cut off"""
+        offset = int(round(start * self.sample_rate))
+        end = min(len(self.buffer), offset + len(pcm))
+        if end > offset:
+            clip = pcm[:end - offset]
+            if clip.dtype == np.int16:
+                clip = clip * np.float32(1 / 32768)
+            self.buffer[offset:end] += clip
+
+    def limit(self, ceiling=0.99):
+        """Scale the mix down if it would clip; returns the gain applied"""
+        if not len(self.buffer):
+            return 1.0
+        peak = max(float(self.buffer.max()), -float(self.buffer.min()))
+        if peak <= ceiling:
+            return 1.0
+        gain = ceiling / peak
+        self.buffer *= gain
+        print(f"Mix peaked at {peak:.2f}, applied {20 * math.log10(gain):.1f} dB to avoid clipping")
+        return gain
+
+    def write_wav(self, path, chunk_seconds=10):
+        """Write the mix as 16-bit PCM WAV, converting a chunk at a time"""
+        chunk = int(chunk_seconds * self.sample_rate)
+        with wave.open(path, 'wb') as wav_file:
+            wav_file.setnchannels(self.channels)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.sample_rate)
+            for start in range(0, len(self.buffer), chunk):
+                samples = np.clip(self.buffer[start:start + chunk], -1.0, 1.0) * 32767
+                wav_file.writeframes(np.round(samples).astype('<i2').tobytes())
+        return path
+
+def mix_timeline(timeline, duration, sample_rate, path, voice_delay=0.1):
+    """Mix every message's effect and voice into one WAV at ``path``.
+
+    Timeline items carry their audio plan entry under ``audio`` with
+    ``effect_pcm``/``voice_pcm`` buffers at ``sample_rate``. The voice starts
+    ``voice_delay`` seconds after the message when an effect plays first.
+    Each entry's ``voice_pcm`` is released once it is mixed (effects are the
+    bank's shared buffers). Returns ``path``, or None for a silent story.
+    """
+    mixer = AudioMixer(duration, sample_rate)
+    has_audio = False
+    for item in timeline:
+        entry = item['audio']
+        if entry['effect_pcm'] is not None:
+            mixer.add(entry['effect_pcm'], item['start'])
+            has_audio = True
+        if entry['voice_pcm'] is not None:
+            delay = voice_delay if entry['effect_pcm'] is not None else 0
+            mixer.add(entry['voice_pcm'], item['start'] + delay)
+            entry['voice_pcm'] = None
+            has_audio = True
+    if not has_audio:
+        return None
+    mixer.limit()
+    return mixer.write_wav(path)
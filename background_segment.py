@@ -0,0 +1,146 @@
+import json
+import subprocess
+import numpy as np
+from moviepy import VideoClip
+
+def probe_video(path):
+    """Return width, height and duration of the first video stream"""
+    probe_cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height:format=duration',
+        '-of', 'json',
+        path
+    ]
+    probe_result = subprocess.run(probe_cmd, capture_output=True, text=True, check=True)
+    info = json.loads(probe_result.stdout)
+    return {
+        'width': int(info['streams'][0]['width']),
+        'height': int(info['streams'][0]['height']),
+        'duration': float(info['format']['duration']),
+    }
+
+def find_keyframe_before(path, t):
+    """Timestamp of the last keyframe at or before ``t`` (where decoding really starts)"""
+    probe_cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-skip_frame', 'nokey',
+        '-read_intervals', f"{max(0, t - 30):.3f}%{t + 0.001:.3f}",
+        '-show_entries', 'frame=best_effort_timestamp_time',
+        '-of', 'csv=p=0',
+        path
+    ]
+    try:
+        probe_result = subprocess.run(probe_cmd, capture_output=True, text=True, check=True)
+        keyframes = [float(line.strip().rstrip(',')) for line in probe_result.stdout.splitlines()
+                     if line.strip().rstrip(',') not in ('', 'N/A')]
+        earlier = [k for k in keyframes if k <= t + 1e-6]
+        return earlier[-1] if earlier else 0.0
+    except Exception as e:
+        print(f"Warning: Could not locate keyframe before {t:.2f}s: {e}")
+        return None
+
+class BackgroundSegment:
+    """Streams only [start, start + duration] of a background video.
+
+    ffmpeg seeks the input to the nearest keyframe before ``start`` and
+    decodes forward from there, resampled to ``fps`` (and optionally scaled
+    to ``size``). If the segment runs past the end of the file it is looped
+    by ffmpeg itself with ``-stream_loop``, so no extra clip copies are kept
+    in memory. Frames are read sequentially; seeking backwards or far ahead
+    restarts the decoder at the new position.
+    """
+
+    def __init__(self, path, start, duration, fps, size=None):
+        self.path = path
+        self.fps = fps
+        self.duration = duration
+        info = probe_video(path)
+        self.source_duration = info['duration']
+        self.source_size = (info['width'], info['height'])
+        self.size = tuple(size) if size else self.source_size
+        self.start = start % self.source_duration if self.source_duration else 0
+        self.looped = self.start + duration > self.source_duration
+        self._process = None
+        self._next_index = 0
+        self._last_frame = None
+
+    @property
+    def w(self):
+        return self.size[0]
+
+    @property
+    def h(self):
+        return self.size[1]
+
+    def decode_range(self):
+        """Describe exactly which part of the source file gets decoded"""
+        end = self.start + self.duration
+        return {
+            'keyframe': find_keyframe_before(self.path, self.start),
+            'start': self.start,
+            'end': end if not self.looped else self.source_duration,
+            'loops': int(np.ceil(end / self.source_duration)) - 1 if self.looped else 0,
+            'duration': self.duration,
+        }
+
+    def _spawn(self, index):
+        self.close()
+        offset = index / self.fps
+        seek = (self.start + offset) % self.source_duration
+        filters = [f"fps={self.fps}"]
+        if self.size != self.source_size:
+            filters.append(f"scale={self.size[0]}:{self.size[1]}:flags=bicubic")
+        cmd = ['ffmpeg', '-v', 'error']
+        if self.looped:
+            cmd += ['-stream_loop', '-1']
+        cmd += [
+            '-ss', f"{seek:.6f}",
+            '-i', self.path,
+            '-t', f"{max(0.0, self.duration - offset) + 1 / self.fps:.6f}",
+            '-an',
+            '-vf', ','.join(filters),
+            '-f', 'rawvideo',
+            '-pix_fmt', 'rgb24',
+            '-'
+        ]
+        self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                         bufsize=self.size[0] * self.size[1] * 3 * 4)
+        self._next_index = index
+
+    def _read_frame(self):
+        frame_bytes = self.size[0] * self.size[1] * 3
+        data = self._process.stdout.read(frame_bytes)
+        self._next_index += 1
+        if len(data) < frame_bytes:
+            # Rounding at the very end of the segment: hold the last frame
+            return self._last_frame
+        self._last_frame = np.frombuffer(data, dtype=np.uint8).reshape((self.size[1], self.size[0], 3))
+        return self._last_frame
+
+    def get_frame(self, t):
+        index = int(round(t * self.fps))
+        if self._process is None or index < self._next_index - 1 or index > self._next_index + self.fps:
+            self._spawn(index)
+        if index == self._next_index - 1 and self._last_frame is not None:
+            return self._last_frame
+        frame = self._last_frame
+        while self._next_index <= index:
+            frame = self._read_frame()
+        if frame is None:
+            frame = np.zeros((self.size[1], self.size[0], 3), dtype=np.uint8)
+        return frame
+
+    def clip(self):
+        """MoviePy clip backed by this segment"""
+        return VideoClip(frame_function=self.get_frame, duration=self.duration)
+
+    def close(self):
+        if self._process is not None:
+            self._process.stdout.close()
+            self._process.terminate()
+            self._process.wait()
+            self._process = None
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+import requests
+from http_client import http_client, RetryPolicy
+
+BACKGROUND_STORE_SETTINGS = {
+    'directory': os.environ.get('BACKGROUND_STORE_DIR', os.path.join(tempfile.gettempdir(), 'background_videos')),
+    'prefetch': os.environ.get('BACKGROUND_PREFETCH', '1') != '0',
+    'max_retries': 3,
+}
+
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class BackgroundStore:
+    """Local library of background videos shared by every job in the container.
+
+    Each background is downloaded once into ``directory`` together with a
+    small JSON sidecar (source URL, size, ETag, SHA-256). Files are checked
+    against the sidecar before use and re-downloaded if they don't match.
+    Downloads are serialized per background with a file lock, so concurrent
+    jobs and gunicorn workers share one copy. Sources may be http(s) or
+    ``file://`` URLs.
+    """
+
+    def __init__(self, directory, sources, max_retries=3):
+        self.directory = directory
+        self.sources = sources
+        self.retry = RetryPolicy(max_attempts=max_retries, base_delay=5)
+        self._verified = {}
+        self._verified_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _video_path(self, name):
+        return os.path.join(self.directory, f"{name}.mp4")
+
+    def _meta_path(self, name):
+        return os.path.join(self.directory, f"{name}.json")
+
+    @contextmanager
+    def _locked(self, name):
+        with open(os.path.join(self.directory, f"{name}.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self, name):
+        try:
+            with open(self._meta_path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_valid(self, name, meta):
+        """Check the local copy against its sidecar (hash checked once per file version)"""
+        path = self._video_path(name)
+        if not meta or meta.get('url') != self.sources.get(name) or not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        if stat.st_size != meta.get('size'):
+            return False
+
+        version = (path, stat.st_mtime, stat.st_size)
+        with self._verified_lock:
+            if self._verified.get(name) == version:
+                return True
+        if _sha256(path) != meta.get('sha256'):
+            print(f"Checksum mismatch for background '{name}', fetching again")
+            return False
+        with self._verified_lock:
+            self._verified[name] = version
+        return True
+
+    def _download(self, name, url, meta=None):
+        """Download ``url`` into the store; returns False if the server says it is unchanged"""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        os.close(fd)
+        try:
+            parsed = urlparse(url)
+            if parsed.scheme == 'file':
+                source_path = url2pathname(parsed.path)
+                stat = os.stat(source_path)
+                etag = f"{int(stat.st_mtime)}-{stat.st_size}"
+                if meta and meta.get('etag') == etag and meta.get('url') == url:
+                    return False
+                with open(temp_path, 'wb') as temp_video, open(source_path, 'rb') as source:
+                    shutil.copyfileobj(source, temp_video, 1024 * 1024)
+            else:
+                headers = dict(DOWNLOAD_HEADERS)
+                if meta and meta.get('etag') and meta.get('url') == url:
+                    headers['If-None-Match'] = meta['etag']
+                response = http_client.send('GET', url, stream=True, headers=headers)
+                if response.status_code == 304:
+                    return False
+                response.raise_for_status()
+
+                total_size = int(response.headers.get('content-length', 0))
+                downloaded = 0
+                with open(temp_path, 'wb') as temp_video:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        if chunk:
+                            downloaded += len(chunk)
+                            temp_video.write(chunk)
+                            if total_size > 0:
+                                print(f"\rDownloading background '{name}': {(downloaded / total_size) * 100:.1f}%", end='')
+                print()
+                if total_size and downloaded != total_size:
+                    raise IOError(f"Incomplete download: got {downloaded} of {total_size} bytes")
+                etag = response.headers.get('ETag')
+
+            new_meta = {
+                'url': url,
+                'size': os.path.getsize(temp_path),
+                'etag': etag,
+                'sha256': _sha256(temp_path),
+                'fetched_at': time.time(),
+            }
+            os.replace(temp_path, self._video_path(name))
+            with open(self._meta_path(name) + '.tmp', 'w') as f:
+                json.dump(new_meta, f)
+            os.replace(self._meta_path(name) + '.tmp', self._meta_path(name))
+            return True
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def path_for(self, name, revalidate=False):
+        """Return a local path for background ``name``, fetching it if needed.
+
+        With ``revalidate`` the source is asked (via ETag) whether it changed.
+        """
+        url = self.sources.get(name)
+        if not url:
+            raise ValueError(f"Invalid background video: {name}")
+
+        with self._locked(name):
+            meta = self._read_meta(name)
+            if self._is_valid(name, meta) and not revalidate:
+                return self._video_path(name)
+
+            def fetch():
+                print(f"Fetching background video '{name}' from: {url}")
+                if not self._download(name, url, meta if self._is_valid(name, meta) else None):
+                    print(f"Background '{name}' is unchanged")
+                return self._video_path(name)
+
+            try:
+                return self.retry.call(fetch, 'background_download')
+            except (requests.exceptions.RequestException, IOError) as e:
+                raise Exception(f"Failed to download video after {self.retry.max_attempts} attempts: {str(e)}")
+
+    def prefetch(self):
+        """Fetch (or revalidate) every background; errors are logged, not raised"""
+        for name in self.sources:
+            try:
+                self.path_for(name, revalidate=True)
+            except Exception as e:
+                print(f"Warning: Could not prefetch background '{name}': {e}")
+
+    def start_prefetch(self):
+        thread = threading.Thread(target=self.prefetch, name='background-prefetch', daemon=True)
+        thread.start()
+        return thread
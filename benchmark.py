@@ -0,0 +1,457 @@
+"""Offline render benchmark.
+
+Runs ``generate_video`` and the full ``/api/generate`` flow against local
+stand-ins so no ElevenLabs quota, Cloudinary bandwidth or Drive storage is
+used:
+
+- a fake ElevenLabs server that returns deterministic MP3s after a
+  configurable latency,
+- a background video generated locally and served from a file:// URL,
+- a fake Drive server speaking the resumable upload protocol, so uploads
+  go through the real uploader (chunking, retries, concurrency) but only
+  their sizes are kept.
+
+Usage:
+    python benchmark.py --sizes 5 50 500 --latency 0.3 --output bench.json
+
+Results are printed (or written) as JSON: per-stage wall and CPU time, peak
+memory and output sizes for each conversation size and entry point.
+"""
+import os
+import io
+import sys
+import json
+import time
+import base64
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+BENCHMARK_VOICES = {
+    'Adam': 'pNInz6obpgDQGcFmaJgB',
+    'Jessica': 'cgSgspJ2msm6clMCkdW9',
+    'Brian': 'nPczCjzI2devNBz1zQrb',
+    'Laura': 'FGY2WhTYpPnrIDTdsKH5',
+    'Antoni': 'ErXwobaYiN019PkySvjV',
+}
+
+WORDS = ("hey what are you doing tonight did you see that no way honestly i cannot believe "
+         "it wait really okay fine see you at eight bring snacks lol").split()
+
+def _tone_mp3(path, duration, frequency):
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', f"sine=frequency={frequency}:duration={duration:.3f}:sample_rate=44100",
+        '-c:a', 'libmp3lame', '-b:a', '128k', path
+    ], check=True)
+
+class FakeTTSServer:
+    """Local stand-in for the ElevenLabs voices and text-to-speech endpoints.
+
+    The MP3 for a line depends only on its text length and voice, so runs
+    are reproducible; ``latency`` seconds are slept before every response.
+    """
+
+    def __init__(self, directory, latency=0.3, seconds_per_char=0.06):
+        self.directory = directory
+        self.latency = latency
+        self.seconds_per_char = seconds_per_char
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def audio_for(self, text, voice_id):
+        duration = round(max(0.5, len(text) * self.seconds_per_char), 1)
+        frequency = 220 + sum(map(ord, voice_id)) % 440
+        path = os.path.join(self.directory, f"tts_{voice_id}_{duration:.1f}.mp3")
+        with self._lock:
+            if not os.path.exists(path):
+                _tone_mp3(path, duration, frequency)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                time.sleep(server.latency)
+                if self.path.startswith('/v1/voices'):
+                    voices = [{'name': name, 'voice_id': voice_id} for name, voice_id in BENCHMARK_VOICES.items()]
+                    self._send(200, json.dumps({'voices': voices}).encode(), 'application/json')
+                else:
+                    self._send(404, b'{}', 'application/json')
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                time.sleep(server.latency)
+                with server._lock:
+                    server.requests += 1
+                if self.path.startswith('/v1/text-to-speech/'):
+                    voice_id = self.path.rsplit('/', 1)[-1]
+                    self._send(200, server.audio_for(body.get('text', ''), voice_id), 'audio/mpeg')
+                else:
+                    self._send(404, b'{}', 'application/json')
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-tts', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class FakeDriveServer:
+    """Local stand-in for the Drive resumable upload endpoint.
+
+    Uploads are counted but not stored. ``failure_rate`` is the chance that
+    a chunk is answered with 503, to exercise the uploader's resume path.
+    """
+
+    def __init__(self, failure_rate=0.0, seed=0):
+        self.failure_rate = failure_rate
+        self.uploads = []
+        self.failures = 0
+        self._sessions = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b'', headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+            def do_POST(self):
+                metadata = json.loads(self._body() or b'{}')
+                if not self.path.startswith('/upload/drive/v3/files'):
+                    return self._send(404, b'{}')
+                with server._lock:
+                    session_id = str(len(server._sessions) + 1)
+                    server._sessions[session_id] = {'name': metadata.get('name'), 'received': 0}
+                self._send(200, headers={'Location': f"{server.url}/upload/drive/v3/files?upload_id={session_id}"})
+
+            def do_PUT(self):
+                chunk = self._body()
+                session_id = self.path.rsplit('=', 1)[-1]
+                with server._lock:
+                    session = server._sessions.get(session_id)
+                    fail = session is not None and server._random.random() < server.failure_rate
+                    if fail:
+                        server.failures += 1
+                if session is None:
+                    return self._send(404, b'{}')
+                if fail:
+                    return self._send(503, b'{"error": {"code": 503, "message": "Backend Error"}}')
+
+                # Content-Range: bytes <first>-<last>/<total>
+                byte_range, total = self.headers.get('Content-Range', 'bytes */0')[len('bytes '):].split('/')
+                if byte_range != '*':
+                    session['received'] = int(byte_range.split('-')[1]) + 1
+                if session['received'] < int(total):
+                    return self._send(308, headers={'Range': f"bytes=0-{session['received'] - 1}"} if session['received'] else None)
+                with server._lock:
+                    server.uploads.append({'name': session['name'], 'size_bytes': session['received']})
+                    file_id = f"benchmark-{len(server.uploads)}"
+                self._send(200, json.dumps({'id': file_id, 'webViewLink': f"{server.url}/files/{file_id}"}).encode())
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='fake-drive', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def make_background(path, duration=60, size=(1080, 1920), fps=30):
+    """Synthetic background video (moving test pattern)"""
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', f"testsrc2=size={size[0]}x{size[1]}:rate={fps}:duration={duration}",
+        '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23', '-pix_fmt', 'yuv420p', '-g', str(fps * 2),
+        path
+    ], check=True)
+    return path
+
+def make_picture(seed):
+    """Small PNG as a data URL, like an uploaded picture message"""
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    image = Image.new('RGB', (480, 360), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(6):
+        x, y = rng.randrange(400), rng.randrange(280)
+        draw.ellipse((x, y, x + 80, y + 80), fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+def make_conversation(count, sound_effects, seed=0, picture_ratio=0.1, effect_ratio=0.15):
+    """Deterministic mix of text, picture and sound-effect messages"""
+    rng = random.Random(seed)
+    pictures = [make_picture(index) for index in range(3)]
+    messages = []
+    for index in range(count):
+        is_sender = index % 2 == 0
+        message = {'id': index, 'is_sender': is_sender, 'soundEffect': None}
+        if rng.random() < picture_ratio:
+            message.update(type='picture', text=rng.choice(pictures))
+        else:
+            message.update(type='text', text=' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 14))))
+        if sound_effects and rng.random() < effect_ratio:
+            message['soundEffect'] = rng.choice(sound_effects)
+        messages.append(message)
+    return messages
+
+def _cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        'self': own.ru_utime + own.ru_stime,
+        'children': children.ru_utime + children.ru_stime,
+    }
+
+class StageRecorder:
+    """Progress callback that splits wall and CPU time by pipeline stage.
+
+    CPU time includes reaped child processes (ffmpeg, Chrome), which are only
+    counted once they exit, so encode CPU lands in the stage that waits for it.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._current = None
+        self._started = None
+        self._cpu = None
+
+    def _close(self):
+        if self._current is None:
+            return
+        cpu = _cpu_seconds()
+        stage = self.stages.setdefault(self._current, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'child_cpu_seconds': 0.0})
+        stage['wall_seconds'] += time.perf_counter() - self._started
+        stage['cpu_seconds'] += cpu['self'] - self._cpu['self']
+        stage['child_cpu_seconds'] += cpu['children'] - self._cpu['children']
+
+    def __call__(self, stage, fraction=None, **details):
+        if stage == self._current:
+            return
+        self._close()
+        self._current = stage
+        self._started = time.perf_counter()
+        self._cpu = _cpu_seconds()
+
+    def finish(self):
+        self._close()
+        self._current = None
+        return {name: {key: round(value, 3) for key, value in stage.items()} for name, stage in self.stages.items()}
+
+def _timed_stage_totals(before, after):
+    """Per-stage call counts and wall time recorded by the ``timed`` decorators between two snapshots"""
+    totals = {}
+    for key, (count, seconds) in after.items():
+        previous_count, previous_seconds = before.get(key, (0, 0.0))
+        if count > previous_count:
+            totals[dict(key)['stage']] = {'calls': count - previous_count,
+                                          'wall_seconds': round(seconds - previous_seconds, 3)}
+    return totals
+
+def _measure(run):
+    """Run ``run(progress)`` and return its result with totals and per-stage timings"""
+    from metrics import track_peak_rss, stage_duration
+    recorder = StageRecorder()
+    timed_before = stage_duration.snapshot()
+    cpu_before = _cpu_seconds()
+    started = time.perf_counter()
+    with track_peak_rss(interval=0.1) as peak:
+        result = run(recorder)
+    cpu_after = _cpu_seconds()
+    return result, {
+        'wall_seconds': round(time.perf_counter() - started, 3),
+        'cpu_seconds': round(cpu_after['self'] - cpu_before['self'], 3),
+        'child_cpu_seconds': round(cpu_after['children'] - cpu_before['children'], 3),
+        'peak_rss_bytes': peak[0],
+        'peak_child_rss_bytes': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+        'stages': recorder.finish(),
+        'timed_stages': _timed_stage_totals(timed_before, stage_duration.snapshot()),
+    }
+
+def run_benchmark(args):
+    workdir = tempfile.mkdtemp(prefix='render_benchmark_')
+    tts_server = FakeTTSServer(os.path.join(workdir, 'tts'), latency=args.latency)
+    os.makedirs(tts_server.directory)
+    tts_server.start()
+    drive_server = FakeDriveServer(failure_rate=args.drive_failure_rate).start()
+
+    # The app reads these at import time
+    os.environ['ELEVENLABS_API_BASE'] = tts_server.url
+    os.environ['DRIVE_API_BASE'] = drive_server.url
+    os.environ['DRIVE_CHUNK_MB'] = '1'   # Several chunks per upload even for short stories
+    os.environ['DRIVE_CREDENTIALS_PATH'] = os.path.join(workdir, 'no-credentials.json')
+    os.environ['BACKGROUND_PREFETCH'] = '0'
+    os.environ['BACKGROUND_STORE_DIR'] = os.path.join(workdir, 'backgrounds')
+    os.environ['TTS_CACHE_DIR'] = os.path.join(workdir, 'tts_cache')
+    os.environ['SEGMENT_CACHE_DIR'] = os.path.join(workdir, 'render_cache')
+    os.environ['JOB_DB_PATH'] = os.path.join(workdir, 'jobs.sqlite3')
+    os.environ['WORKSPACE_ROOT'] = os.path.join(workdir, 'workspaces')
+    os.environ.setdefault('CHAT_RENDER_BACKEND', args.render_backend)
+    import app as app_module
+
+    background_path = make_background(os.path.join(workdir, 'background.mp4'), duration=args.background_seconds)
+    app_module.background_store.sources['benchmark'] = 'file://' + background_path
+
+    # Sound effects that are not checked out are replaced with short tones
+    for index, (name, path) in enumerate(list(app_module.SOUND_EFFECTS.items())):
+        if not os.path.exists(path):
+            stand_in = os.path.join(workdir, f"sfx_{name}.mp3")
+            _tone_mp3(stand_in, 0.4 + 0.2 * index, 880 + 110 * index)
+            app_module.SOUND_EFFECTS[name] = stand_in
+    app_module.sfx_bank.load()
+
+    header = {
+        'profileImage': '',
+        'headerName': 'Benchmark',
+        'voiceSettings': {'apiKey': 'benchmark-key', 'sender': 'male', 'receiver': 'female'},
+        'backgroundVideo': 'benchmark',
+        'theme': 'light',
+        'renderBackend': args.render_backend,
+        'compositor': args.compositor,
+        'quality': args.quality,
+    }
+
+    report = {
+        'commit': subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None,
+        'settings': {key: value for key, value in vars(args).items() if key != 'output'},
+        'runs': [],
+    }
+
+    try:
+        for size in args.sizes:
+            messages = make_conversation(size, list(app_module.SOUND_EFFECTS), seed=size)
+            mix = {
+                'text': sum(1 for msg in messages if msg['type'] == 'text'),
+                'picture': sum(1 for msg in messages if msg['type'] == 'picture'),
+                'sound_effect': sum(1 for msg in messages if msg['soundEffect']),
+            }
+
+            if 'generate_video' in args.entry_points:
+                if not args.warm_cache:
+                    for cache in (app_module.tts_cache, app_module.frame_cache, app_module.segment_cache):
+                        shutil.rmtree(cache.directory, ignore_errors=True)
+                        os.makedirs(cache.directory, exist_ok=True)
+                requests_before = tts_server.requests
+
+                def render(progress):
+                    with app_module.workspace_manager.create() as workspace:
+                        outputs = app_module.generate_video(messages, dict(header), workspace, progress=progress)
+                        return {name: os.path.getsize(path) for name, path in outputs.items()}
+
+                output_sizes, measured = _measure(render)
+                report['runs'].append(dict(measured, entry_point='generate_video', messages=size, mix=mix,
+                                           tts_requests=tts_server.requests - requests_before,
+                                           output_bytes=output_sizes))
+                print(f"generate_video, {size} messages: {measured['wall_seconds']} s", file=sys.stderr)
+
+            if 'api' in args.entry_points:
+                if not args.warm_cache:
+                    for cache in (app_module.tts_cache, app_module.frame_cache, app_module.segment_cache):
+                        shutil.rmtree(cache.directory, ignore_errors=True)
+                        os.makedirs(cache.directory, exist_ok=True)
+                requests_before = tts_server.requests
+                uploads_before = len(drive_server.uploads)
+                failures_before = drive_server.failures
+                client = app_module.app.test_client()
+
+                # The endpoint reports no progress, so only timed_stages break this run down
+                def request_render(progress):
+                    response = client.post('/api/generate', json=dict(header, messages=messages))
+                    return response.status_code, response.get_json()
+
+                (status, body), measured = _measure(request_render)
+                report['runs'].append(dict(measured, entry_point='/api/generate', messages=size, mix=mix,
+                                           status=status, error=None if status == 200 else body,
+                                           tts_requests=tts_server.requests - requests_before,
+                                           drive_chunk_failures=drive_server.failures - failures_before,
+                                           output_bytes={upload['name']: upload['size_bytes']
+                                                         for upload in drive_server.uploads[uploads_before:]}))
+                print(f"/api/generate, {size} messages: {measured['wall_seconds']} s (HTTP {status})", file=sys.stderr)
+
+    finally:
+        tts_server.stop()
+        drive_server.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return report
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline render benchmark with local stand-ins for external services")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 50, 500], help="Conversation sizes (messages)")
+    parser.add_argument('--entry-points', nargs='+', choices=['generate_video', 'api'], default=['generate_video', 'api'])
+    parser.add_argument('--latency', type=float, default=0.3, help="Fake TTS latency per request (seconds)")
+    parser.add_argument('--render-backend', choices=['native', 'selenium'], default='native')
+    parser.add_argument('--compositor', choices=['moviepy', 'ffmpeg', 'segmented'], default='moviepy')
+    parser.add_argument('--quality', choices=['draft', 'standard', 'final'], default='final')
+    parser.add_argument('--drive-failure-rate', type=float, default=0.0,
+                        help="Fraction of fake Drive upload chunks answered with 503")
+    parser.add_argument('--background-seconds', type=int, default=60)
+    parser.add_argument('--warm-cache', action='store_true', help="Keep the TTS and render caches between runs")
+    parser.add_argument('--keep', action='store_true', help="Keep the benchmark working directory")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    report = run_benchmark(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+import atexit
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+# Pool sizing is tied to how many requests can capture at the same time.
+# Chats are captured by render jobs, so by default there is one browser per job worker
+# (JOB_WORKERS); synchronous /api/generate renders wait for a free one.
+CHROME_POOL_SETTINGS = {
+    'size': int(os.environ.get('CHROME_POOL_SIZE', os.environ.get('JOB_WORKERS', '2'))),
+    'max_uses': int(os.environ.get('CHROME_MAX_USES', '50')),      # Recycle a driver after this many captures
+    'acquire_timeout': int(os.environ.get('CHROME_ACQUIRE_TIMEOUT', '120')),
+    'page_url': os.environ.get('CAPTURE_PAGE_URL', 'http://127.0.0.1:8080'),
+}
+
+def build_chrome_options():
+    """Chrome options used for every capture driver"""
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--hide-scrollbars')
+    chrome_options.add_argument('--force-device-scale-factor=1')
+    chrome_options.add_argument('--window-size=414,900')
+    return chrome_options
+
+class PooledDriver:
+    """A warm webdriver plus the bookkeeping the pool needs to recycle it"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+        self.page_ready = False
+
+class ChromeDriverPool:
+    """Process-wide pool of headless Chrome drivers.
+
+    Drivers are started lazily, handed out one capture at a time, health
+    checked before reuse and recycled after ``max_uses`` captures. The page
+    is reloaded when a driver is returned so the next user gets a clean DOM.
+    """
+
+    def __init__(self, size, max_uses, page_url, acquire_timeout=120):
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.page_url = page_url
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._closed = False
+        self.started = 0
+        self.recycled = 0
+
+    def _start_driver(self):
+        print("Starting new headless Chrome driver for the pool...")
+        driver = webdriver.Chrome(options=build_chrome_options())
+        self.started += 1
+        return PooledDriver(driver)
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            print(f"Warning: Error quitting Chrome driver: {e}")
+
+    def _is_healthy(self, pooled):
+        try:
+            return pooled.driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    def _reset_page(self, pooled):
+        """Load a fresh copy of the chat page so no state leaks between uses"""
+        try:
+            pooled.driver.get(self.page_url)
+            pooled.page_ready = True
+        except Exception as e:
+            print(f"Warning: Error resetting Chrome page: {e}")
+            pooled.page_ready = False
+
+    def acquire(self):
+        """Take a ready driver from the pool, starting one if none is idle"""
+        if self._closed:
+            raise RuntimeError("Chrome driver pool is shut down")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"No Chrome driver available after {self.acquire_timeout} seconds")
+
+        try:
+            while True:
+                with self._lock:
+                    pooled = self._idle.pop() if self._idle else None
+
+                if pooled is None:
+                    pooled = self._start_driver()
+                elif not self._is_healthy(pooled):
+                    print("Discarding unhealthy Chrome driver")
+                    self._quit(pooled)
+                    self.recycled += 1
+                    continue
+
+                if not pooled.page_ready:
+                    self._reset_page(pooled)
+                pooled.uses += 1
+                return pooled
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, pooled, broken=False):
+        """Return a driver to the pool, recycling it when broken or worn out"""
+        try:
+            if broken or self._closed or pooled.uses >= self.max_uses:
+                self._quit(pooled)
+                self.recycled += 1
+                return
+
+            self._reset_page(pooled)
+            with self._lock:
+                self._idle.append(pooled)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def session(self):
+        """Borrow a driver for one capture: ``with pool.session() as driver:``"""
+        pooled = self.acquire()
+        broken = False
+        try:
+            yield pooled.driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._quit(pooled)
+
+chrome_pool = ChromeDriverPool(
+    size=CHROME_POOL_SETTINGS['size'],
+    max_uses=CHROME_POOL_SETTINGS['max_uses'],
+    page_url=CHROME_POOL_SETTINGS['page_url'],
+    acquire_timeout=CHROME_POOL_SETTINGS['acquire_timeout'],
+)
+
+atexit.register(chrome_pool.shutdown)
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import socket
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from google.oauth2 import service_account
+from google.auth.credentials import AnonymousCredentials
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload
+from metrics import registry, record_bytes, retries
+
+DRIVE_SETTINGS = {
+    'folder_id': os.environ.get('DRIVE_FOLDER_ID', '1Q-w2JOD4fiEhI8bs8btcF0zsE92SuXv5'),  # The Google Drive folder ID where videos will be uploaded
+    'credentials_path': os.environ.get('DRIVE_CREDENTIALS_PATH', 'service-account.json'),  # Path to your service account JSON file
+    'api_base': os.environ.get('DRIVE_API_BASE'),   # e.g. a local fake Drive server; credentials are then optional
+    'chunk_size': int(os.environ.get('DRIVE_CHUNK_MB', '16')) * 1024 * 1024,   # Must be a multiple of 256 KiB
+    'workers': int(os.environ.get('DRIVE_UPLOAD_WORKERS', '4')),
+    'max_retries': 5,
+}
+
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+
+upload_throughput = registry.histogram(
+    'drive_upload_throughput_bytes_per_second', 'Throughput of each completed Drive upload',
+    buckets=tuple(2 ** power for power in range(16, 31, 2))   # 64 KiB/s .. 1 GiB/s
+)
+
+class DriveUploader:
+    """Long-lived Google Drive uploader.
+
+    Credentials are loaded once. googleapiclient services are not thread
+    safe, so each upload thread builds its own client once (from the
+    bundled discovery document, no network round trip) and keeps it.
+    Uploads are resumable in ``chunk_size`` chunks; transient HTTP and
+    network errors resume the session from the last confirmed byte.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._credentials = None
+        self._credentials_lock = threading.Lock()
+        self._local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, settings['workers']), thread_name_prefix='drive-upload')
+
+    def _get_credentials(self):
+        with self._credentials_lock:
+            if self._credentials is None:
+                path = self.settings['credentials_path']
+                if self.settings['api_base'] and not os.path.exists(path):
+                    self._credentials = AnonymousCredentials()
+                else:
+                    self._credentials = service_account.Credentials.from_service_account_file(
+                        path, scopes=['https://www.googleapis.com/auth/drive.file']
+                    )
+            return self._credentials
+
+    def service(self):
+        """Drive client for the calling thread"""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            credentials = self._get_credentials()
+            if self.settings['api_base']:
+                document = json.loads(get_static_doc('drive', 'v3'))
+                document['rootUrl'] = self.settings['api_base'].rstrip('/') + '/'
+                document['baseUrl'] = document['rootUrl'] + document['servicePath']
+                service = build_from_document(document, credentials=credentials)
+            else:
+                service = build('drive', 'v3', credentials=credentials, cache_discovery=False)
+            self._local.service = service
+        return service
+
+    def upload(self, file_path, file_name, mimetype='video/mp4'):
+        """Upload a file and return its id, link and throughput; raises on failure"""
+        size = os.path.getsize(file_path)
+        file_metadata = {
+            'name': file_name,
+            'parents': [self.settings['folder_id']] if self.settings['folder_id'] else None
+        }
+        media = MediaFileUpload(file_path, mimetype=mimetype, chunksize=self.settings['chunk_size'], resumable=True)
+        request = self.service().files().create(body=file_metadata, media_body=media, fields='id, webViewLink')
+
+        started = time.perf_counter()
+        response = None
+        failures = 0
+        while response is None:
+            try:
+                # Retries are all done here, so googleapiclient's own backoff is turned off
+                _, response = request.next_chunk(num_retries=0)
+            except (HttpError, ConnectionError, socket.timeout) as e:
+                status = getattr(getattr(e, 'resp', None), 'status', None)
+                failures += 1
+                if (status is not None and int(status) not in TRANSIENT_STATUS) or failures > self.settings['max_retries']:
+                    raise
+                delay = min(30, 2 ** failures)
+                print(f"Drive upload of {file_name} interrupted ({e}); resuming in {delay} seconds...")
+                retries.inc(operation='drive_upload', reason='transient')
+                time.sleep(delay)
+
+        seconds = time.perf_counter() - started
+        throughput = size / seconds if seconds > 0 else 0
+        record_bytes('upload_to_drive', size)
+        upload_throughput.observe(throughput)
+        print(f"Uploaded {file_name}: {size / (1024 * 1024):.1f} MB in {seconds:.1f} s "
+              f"({throughput / (1024 * 1024):.1f} MB/s)")
+        return {
+            'id': response.get('id'),
+            'link': response.get('webViewLink'),
+            'bytes': size,
+            'seconds': round(seconds, 3),
+            'throughput': round(throughput),
+        }
+
+    def submit(self, func, *args):
+        """Run ``func(*args)`` (normally an upload) on the upload executor; returns a Future"""
+        return self.executor.submit(func, *args)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+drive_uploader = DriveUploader(DRIVE_SETTINGS)
+atexit.register(drive_uploader.shutdown)
@@ -0,0 +1,214 @@
+import os
+import subprocess
+import numpy as np
+from metrics import timed
+
+# Final delivery settings. The composition is encoded straight to these, so
+# no separate enhancement or speed-up re-encode is needed afterwards.
+ENCODE_SETTINGS = {
+    'fps': 60,
+    'height': 1080,
+    'preset': 'slow',
+    'crf': 17,
+    'maxrate': '20M',
+    'bufsize': '40M',
+    'audio_bitrate': '320k',
+    'audio_rate': 48000,
+    'speed_factor': 1.5,
+    'scale_flags': 'lanczos',
+    'full_size_background': True,   # Decode the background at its own size and scale once at the end
+    'spedup': True,                 # Also produce the sped-up rendition
+}
+
+# Overrides of ENCODE_SETTINGS per quality tier. 'final' is the delivery render;
+# 'draft' is a quick 540p/30 fps preview for iterating on a script.
+QUALITY_TIERS = {
+    'draft': {
+        'fps': 30,
+        'height': 540,
+        'preset': 'veryfast',
+        'crf': 26,
+        'maxrate': '4M',
+        'bufsize': '8M',
+        'audio_bitrate': '128k',
+        'scale_flags': 'bilinear',
+        'full_size_background': False,
+        'spedup': False,
+    },
+    'standard': {
+        'fps': 30,
+        'height': 720,
+        'preset': 'medium',
+        'crf': 20,
+        'maxrate': '8M',
+        'bufsize': '16M',
+        'audio_bitrate': '192k',
+        'scale_flags': 'bicubic',
+        'full_size_background': False,
+    },
+    'final': {},
+}
+
+DEFAULT_QUALITY = os.environ.get('QUALITY_TIER', 'final').lower()
+
+def quality_settings(tier=None):
+    """ENCODE_SETTINGS with the overrides for ``tier`` (defaults to QUALITY_TIER)"""
+    tier = (tier or DEFAULT_QUALITY).lower()
+    if tier not in QUALITY_TIERS:
+        raise ValueError(f"Invalid quality tier: {tier} (expected one of {', '.join(QUALITY_TIERS)})")
+    return dict(ENCODE_SETTINGS, **QUALITY_TIERS[tier], quality=tier)
+
+def canvas_size(source_size, settings):
+    """Size to composite at: the source size, or the delivery height when decoding reduced"""
+    width, height = source_size
+    if settings['full_size_background'] or height <= settings['height']:
+        return (width, height)
+    scaled_width = int(round(width * settings['height'] / height / 2)) * 2
+    return (scaled_width, settings['height'])
+
+def _video_codec_args(settings):
+    args = [
+        '-c:v', 'libx264',
+        '-preset', settings['preset'],
+        '-crf', str(settings['crf']),
+        '-maxrate', settings['maxrate'],
+        '-bufsize', settings['bufsize'],
+        '-profile:v', 'high',
+        '-pix_fmt', 'yuv420p',
+        '-r', str(settings['fps']),
+        '-movflags', '+faststart',
+    ]
+    if settings.get('threads'):
+        # Parallel segment encoders split the cores instead of each taking all of them
+        args += ['-threads', str(settings['threads'])]
+    return args
+
+def _audio_codec_args(settings):
+    return ['-c:a', 'aac', '-b:a', settings['audio_bitrate'], '-ar', str(settings['audio_rate'])]
+
+def rendition_graph(video_label, audio_label, source_height, outputs, settings):
+    """Filter graph and output arguments that turn one composed stream into renditions.
+
+    ``outputs`` maps 'original' and optionally 'spedup' to output paths. The
+    video is scaled to the delivery height once and then split between the
+    renditions; ``audio_label`` may be None for a silent timeline.
+    """
+    fps = settings['fps']
+    speed = settings['speed_factor']
+    spedup = outputs.get('spedup')
+
+    video_filters = []
+    if source_height != settings['height']:
+        video_filters.append(f"scale=-2:{settings['height']}:flags={settings['scale_flags']}")
+    video_filters.append('format=yuv420p')
+    graph = [f"{video_label}{','.join(video_filters)}" + ("[vout]" if not spedup else ",split=2[vout][vsrc]")]
+    if spedup:
+        graph.append(f"[vsrc]setpts=PTS/{speed},fps={fps}[vfast]")
+    if audio_label:
+        if spedup:
+            graph.append(f"{audio_label}asplit=2[aout][asrc]")
+            graph.append(f"[asrc]atempo={speed}[afast]")
+        else:
+            graph.append(f"{audio_label}anull[aout]")
+
+    args = ['-map', '[vout]'] + (['-map', '[aout]'] if audio_label else [])
+    args += _video_codec_args(settings) + (_audio_codec_args(settings) if audio_label else []) + [outputs['original']]
+    if spedup:
+        args += ['-map', '[vfast]'] + (['-map', '[afast]'] if audio_label else [])
+        args += _video_codec_args(settings) + (_audio_codec_args(settings) if audio_label else []) + [spedup]
+    return graph, args
+
+def run_ffmpeg(cmd, workspace, log_name='ffmpeg_encode.log', feed=None, duration=None, on_progress=None):
+    """Run ffmpeg with stderr captured in the workspace.
+
+    ``feed(stdin)`` streams input into ffmpeg. Without a feed, ``on_progress``
+    receives the fraction of ``duration`` encoded so far.
+    """
+    track_progress = on_progress is not None and duration and not feed
+    if track_progress:
+        cmd = cmd[:1] + ['-progress', 'pipe:1'] + cmd[1:]
+
+    stderr_path = workspace.path(log_name)
+    with open(stderr_path, 'wb') as stderr_file:
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE if feed else subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE if track_progress else subprocess.DEVNULL,
+                                   stderr=stderr_file)
+        finished = False
+        try:
+            if feed:
+                feed(process.stdin)
+                process.stdin.close()
+            elif track_progress:
+                for line in process.stdout:
+                    key, _, value = line.decode(errors='replace').strip().partition('=')
+                    if key == 'out_time_us' and value.isdigit():
+                        on_progress(min(1.0, int(value) / 1e6 / duration))
+            finished = True
+        except BrokenPipeError:
+            finished = True   # ffmpeg exited early; its return code and log say why
+        finally:
+            if not finished:
+                # The feed or a callback raised: stop ffmpeg rather than leave it waiting for frames
+                try:
+                    if process.stdin:
+                        process.stdin.close()
+                except OSError:
+                    pass
+                process.kill()
+            return_code = process.wait()
+
+    if return_code != 0:
+        with open(stderr_path, 'r', errors='replace') as f:
+            raise Exception(f"ffmpeg encode failed: {f.read()[-2000:]}")
+
+def build_rendition_command(size, audio_path, outputs, settings):
+    """ffmpeg command that reads raw RGB frames on stdin and writes every rendition"""
+    width, height = size
+    cmd = [
+        'ffmpeg', '-y', '-v', 'error', '-nostats',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{width}x{height}", '-r', str(settings['fps']), '-i', '-',
+    ]
+    if audio_path:
+        cmd += ['-i', audio_path]
+
+    graph, output_args = rendition_graph('[0:v]', '[1:a]' if audio_path else None, height, outputs, settings)
+    return cmd + ['-filter_complex', ';'.join(graph)] + output_args
+
+@timed('compose_encode')
+def encode_renditions(clip, outputs, workspace, settings=None, on_progress=None, on_pass=None, audio_path=None):
+    """Render ``clip`` once and encode every rendition in a single ffmpeg process.
+
+    The audio track is a premixed WAV (``audio_path``) or, failing that, the
+    clip's own audio written once as PCM; either is encoded to AAC per
+    rendition. ``on_progress(fraction)`` is called while frames are being
+    composited and ``on_pass(name, **details)`` when each pass starts.
+    Returns ``outputs``.
+    """
+    on_pass = on_pass or (lambda name, **details: None)
+    settings = dict(ENCODE_SETTINGS, **(settings or {}))
+    fps = settings['fps']
+
+    if audio_path is None and clip.audio is not None:
+        audio_path = workspace.path('timeline_audio.wav')
+        on_pass('audio', duration=round(clip.duration, 3))
+        clip.audio.write_audiofile(audio_path, fps=settings['audio_rate'], nbytes=2,
+                                   codec='pcm_s16le', logger=None)
+
+    cmd = build_rendition_command(clip.size, audio_path, outputs, settings)
+    print(f"\nEncoding renditions in one pass: {', '.join(outputs)}")
+    on_pass('video', renditions=list(outputs), fps=fps, height=settings['height'])
+    total_frames = max(1, int(np.ceil(clip.duration * fps)))
+
+    def feed(stdin):
+        for index, frame in enumerate(clip.iter_frames(fps=fps, dtype='uint8', logger=None)):
+            stdin.write(np.ascontiguousarray(frame[:, :, :3]).data)
+            if on_progress and index % fps == 0:
+                on_progress(min(1.0, index / total_frames))
+
+    run_ffmpeg(cmd, workspace, feed=feed)
+    if on_progress:
+        on_progress(1.0)
+
+    for name, path in outputs.items():
+        print(f"{name}: {path} ({os.path.getsize(path) / (1024 * 1024):.2f} MB)")
+    return outputs
@@ -0,0 +1,77 @@
+import os
+from encoder import ENCODE_SETTINGS, rendition_graph, run_ffmpeg
+from metrics import timed
+
+def build_composite_command(background, timeline, audio_path, duration, outputs, workspace, settings):
+    """ffmpeg command that composites the whole story in one process.
+
+    ``background`` describes the source segment (path, start, looped, size
+    to composite at and the file's own source_size),
+    ``timeline`` holds one overlay per message state (PNG path, position,
+    start, duration) and ``audio_path`` is the premixed soundtrack (or None).
+    Overlays are switched on with ``enable`` expressions.
+    """
+    fps = settings['fps']
+    cmd = ['ffmpeg', '-y', '-v', 'error', '-nostats']
+    if background['looped']:
+        cmd += ['-stream_loop', '-1']
+    cmd += ['-ss', f"{background['start']:.6f}", '-t', f"{duration:.6f}", '-i', background['path']]
+
+    for item in timeline:
+        cmd += ['-i', item['png_path']]
+    if audio_path:
+        cmd += ['-i', audio_path]
+
+    background_filters = [f"fps={fps}"]
+    if tuple(background.get('source_size', background['size'])) != tuple(background['size']):
+        # Reduced-size tiers shrink the background before compositing
+        width, height = background['size']
+        background_filters.append(f"scale={width}:{height}:flags={settings['scale_flags']}")
+    graph = [f"[0:v]{','.join(background_filters)},setpts=PTS-STARTPTS[bg0]"]
+    label = '[bg0]'
+    for index, item in enumerate(timeline, start=1):
+        x, y = item['position']
+        start = item['start']
+        end = item['start'] + item['duration']
+        next_label = f"[bg{index}]"
+        graph.append(f"{label}[{index}:v]overlay=x={x}:y={y}:eof_action=repeat:"
+                     f"enable='gte(t,{start:.6f})*lt(t,{end:.6f})'{next_label}")
+        label = next_label
+
+    audio_label = f"[{1 + len(timeline)}:a]" if audio_path else None
+
+    rendition_filters, output_args = rendition_graph(label, audio_label, background['size'][1], outputs, settings)
+    graph += rendition_filters
+
+    # The graph grows with the number of messages, so pass it as a script file
+    script_path = workspace.path('filter_graph.txt')
+    with open(script_path, 'w') as f:
+        f.write(';\n'.join(graph))
+    return cmd + ['-filter_complex_script', script_path, '-t', f"{duration:.6f}"] + output_args
+
+@timed('compose_encode')
+def compose_with_ffmpeg(background, timeline, audio_path, duration, outputs, workspace,
+                        settings=None, on_progress=None, on_pass=None):
+    """Composite and encode every rendition with a single ffmpeg process.
+
+    Each timeline item's ``image`` (RGBA PIL image) is written to the
+    workspace as a PNG first. ``on_pass(name, **details)`` is called when the
+    overlay and composite passes start. Returns ``outputs``.
+    """
+    settings = dict(ENCODE_SETTINGS, **(settings or {}))
+    on_pass = on_pass or (lambda name, **details: None)
+    on_pass('overlays', count=len(timeline))
+    for index, item in enumerate(timeline):
+        item['png_path'] = workspace.path(f"overlay_{index:04d}.png")
+        item['image'].save(item['png_path'])
+
+    cmd = build_composite_command(background, timeline, audio_path, duration, outputs, workspace, settings)
+    print(f"\nCompositing {len(timeline)} overlays with ffmpeg: {', '.join(outputs)}")
+    on_pass('composite', renditions=list(outputs), fps=settings['fps'], height=settings['height'])
+    run_ffmpeg(cmd, workspace, log_name='ffmpeg_composite.log', duration=duration, on_progress=on_progress)
+    if on_progress:
+        on_progress(1.0)
+
+    for name, path in outputs.items():
+        print(f"{name}: {path} ({os.path.getsize(path) / (1024 * 1024):.2f} MB)")
+    return outputs
@@ -0,0 +1,134 @@
+import os
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import registry, retries
+
+HTTP_SETTINGS = {
+    'pool_connections': int(os.environ.get('HTTP_POOL_HOSTS', '16')),   # Hosts kept in the pool manager
+    'pool_maxsize': int(os.environ.get('HTTP_POOL_SIZE', '16')),   # Keep-alive connections per host
+    'connect_timeout': float(os.environ.get('HTTP_CONNECT_TIMEOUT', '5')),
+    'read_timeout': float(os.environ.get('HTTP_READ_TIMEOUT', '60')),
+    'max_attempts': int(os.environ.get('HTTP_MAX_ATTEMPTS', '5')),
+    'base_delay': 3,   # Seconds before the first retry, doubled on each further one
+    'max_delay': 60,
+}
+
+# Statuses worth retrying: rate limiting and transient server trouble
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+request_duration = registry.histogram('http_client_request_duration_seconds',
+                                      'Outbound HTTP request latency by host, until the response headers arrive')
+
+class RetryPolicy:
+    """Attempt count and exponential backoff shared by every outbound call"""
+
+    def __init__(self, max_attempts=5, base_delay=3, max_delay=60, statuses=RETRY_STATUS):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.statuses = statuses
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait after failed ``attempt`` (0-based), honouring a server's Retry-After"""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        return min(self.max_delay, self.base_delay * (2 ** attempt))
+
+    def call(self, func, operation, retry_on=(requests.exceptions.RequestException, IOError)):
+        """Call ``func()`` until it stops raising ``retry_on``; the last error is re-raised"""
+        for attempt in range(self.max_attempts):
+            try:
+                return func()
+            except retry_on as e:
+                if attempt == self.max_attempts - 1:
+                    raise
+                delay = self.delay(attempt)
+                print(f"{operation} failed ({str(e)}). Retrying in {delay} seconds...")
+                retries.inc(operation=operation, reason='network')
+                time.sleep(delay)
+
+def _retry_after(response):
+    value = response.headers.get('Retry-After')
+    return float(value) if value and value.isdigit() else None
+
+class HttpClient:
+    """One pooled ``requests`` session for every outbound call in the process.
+
+    Connections are kept alive per host (up to ``pool_maxsize`` each), every
+    request gets a (connect, read) timeout unless the caller passes its own,
+    and latency is recorded per host. ``request`` retries connection errors
+    and RETRY_STATUS responses with the shared ``RetryPolicy``; with a
+    ``throttle`` (rate_limit.ApiThrottle) it also paces requests and turns
+    busy responses into a pause for every caller using the same key.
+    """
+
+    def __init__(self, settings):
+        self.timeout = (settings['connect_timeout'], settings['read_timeout'])
+        self.retry = RetryPolicy(settings['max_attempts'], settings['base_delay'], settings['max_delay'])
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=settings['pool_connections'], pool_maxsize=settings['pool_maxsize'])
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def send(self, method, url, **kwargs):
+        """Single attempt, with the default timeout and latency recorded"""
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            request_duration.observe(time.perf_counter() - started, host=urlparse(url).netloc, status='error')
+            raise
+        request_duration.observe(time.perf_counter() - started, host=urlparse(url).netloc, status=str(response.status_code))
+        return response
+
+    def request(self, method, url, operation, throttle=None, busy=None, retry=None, **kwargs):
+        """Send with retries; returns the last response, or re-raises the last connection error.
+
+        ``busy(response)`` flags extra responses to retry (e.g. an API's own
+        "system busy" error with a 200-range status).
+        """
+        retry = retry or self.retry
+        for attempt in range(retry.max_attempts):
+            last_attempt = attempt == retry.max_attempts - 1
+            if throttle:
+                throttle.wait()
+            try:
+                response = self.send(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if last_attempt:
+                    raise
+                delay = retry.delay(attempt)
+                print(f"Network error calling {operation} ({str(e)}). Retrying in {delay} seconds...")
+                retries.inc(operation=operation, reason='network')
+                time.sleep(delay)
+                continue
+
+            is_busy = response.status_code == 429 or bool(busy and busy(response))
+            if response.status_code not in retry.statuses and not is_busy:
+                if throttle:
+                    throttle.report_success()
+                return response
+            if last_attempt:
+                return response
+            response.close()   # Hand the connection back to the pool before retrying
+
+            if throttle:
+                # The throttle pauses every request made with this key, including the retry
+                delay = throttle.report_busy(_retry_after(response))
+            else:
+                delay = retry.delay(attempt, _retry_after(response))
+            print(f"{operation} returned {response.status_code}. Retrying in {delay} seconds...")
+            retries.inc(operation=operation, reason='busy' if is_busy else 'server')
+            if not throttle:
+                time.sleep(delay)
+
+    def get(self, url, operation, **kwargs):
+        return self.request('GET', url, operation, **kwargs)
+
+    def post(self, url, operation, **kwargs):
+        return self.request('POST', url, operation, **kwargs)
+
+http_client = HttpClient(HTTP_SETTINGS)
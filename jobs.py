@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import uuid
+import queue
+import socket
+import sqlite3
+import tempfile
+import threading
+import traceback
+from contextlib import contextmanager
+
+JOB_SETTINGS = {
+    'db_path': os.environ.get('JOB_DB_PATH', os.path.join(tempfile.gettempdir(), 'jobs.sqlite3')),
+    'workers': int(os.environ.get('JOB_WORKERS', '2')),
+    'queue_size': int(os.environ.get('JOB_QUEUE_SIZE', '20')),
+    'owner_ttl': int(os.environ.get('JOB_OWNER_TTL', '60')),   # A process that hasn't heartbeated for this long is presumed dead
+    'recover_interval': int(os.environ.get('JOB_RECOVER_SECONDS', '15')),   # How often workers heartbeat and adopt orphaned jobs
+    'max_attempts': int(os.environ.get('JOB_MAX_ATTEMPTS', '3')),   # Runs a job gets before a crashed one is failed instead of re-queued
+}
+
+class QueueFull(Exception):
+    pass
+
+class JobStore:
+    """SQLite-backed job records so jobs survive worker restarts"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress REAL DEFAULT 0,
+                    payload TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    created_at REAL,
+                    updated_at REAL
+                )
+            """)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if 'owner' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_owners (
+                    owner TEXT PRIMARY KEY,
+                    heartbeat_at REAL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def create(self, payload, owner=None):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, stage, payload, owner, created_at, updated_at) VALUES (?, 'queued', 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), owner, now, now)
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def claim(self, job_id, owner=None):
+        """Atomically move a queued job owned by ``owner`` to running; returns its payload or None"""
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'running', stage = 'starting', attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ? AND status = 'queued' AND owner IS ?",
+                (time.time(), job_id, owner)
+            ).rowcount
+            if not updated:
+                return None
+            row = conn.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def update(self, job_id, stage=None, progress=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = COALESCE(?, stage), progress = COALESCE(?, progress), updated_at = ? WHERE id = ?",
+                (stage, progress, time.time(), job_id)
+            )
+
+    def finish(self, job_id, result=None, error=None):
+        """Record the outcome and drop the payload (it holds the user's API key)"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, progress = ?, result = ?, error = ?, payload = NULL, updated_at = ? WHERE id = ?",
+                ('failed' if error else 'done', 'failed' if error else 'done', 1.0 if not error else None,
+                 json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def heartbeat(self, owner, forget_after=86400):
+        """Record that ``owner`` (a worker process) is alive, and forget owners long gone"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO job_owners (owner, heartbeat_at) VALUES (?, ?)", (owner, now))
+            conn.execute("DELETE FROM job_owners WHERE heartbeat_at < ?", (now - forget_after,))
+
+    def live_owners(self, owner_ttl):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT owner FROM job_owners WHERE heartbeat_at >= ?", (time.time() - owner_ttl,)).fetchall()
+        return {row[0] for row in rows}
+
+    def unfinished(self):
+        """(id, owner, attempts) of every queued or running job, oldest first"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT id, owner, attempts FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+
+    def adopt(self, job_id, old_owner, new_owner):
+        """Re-queue an unfinished job under ``new_owner`` if it still belongs to ``old_owner``"""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', owner = ?, updated_at = ? "
+                "WHERE id = ? AND owner IS ? AND status IN ('queued', 'running')",
+                (new_owner, time.time(), job_id, old_owner)
+            ).rowcount == 1
+
+    def abandon(self, job_id, old_owner, error):
+        """Fail an unfinished job instead of re-queuing it, if it still belongs to ``old_owner``"""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'failed', stage = 'failed', progress = NULL, error = ?, payload = NULL, updated_at = ? "
+                "WHERE id = ? AND owner IS ? AND status IN ('queued', 'running')",
+                (error, time.time(), job_id, old_owner)
+            ).rowcount == 1
+
+class JobProgress:
+    """Handed to the job handler to report stage, progress and event details.
+
+    The stage and progress are persisted; every call is also published to
+    the broker (if any) with its details, e.g. ``progress('tts', 0.2, done=3, total=9)``.
+    """
+
+    def __init__(self, store, job_id, broker=None):
+        self.store = store
+        self.job_id = job_id
+        self.broker = broker
+        self._stored = None
+
+    def __call__(self, stage, progress=None, **details):
+        if self.broker:
+            self.broker.publish(self.job_id, stage, progress, **details)
+        # Fine-grained events (per TTS line, per frame) only reach the store once per percent
+        stored = (stage, round(progress, 2) if progress is not None else None)
+        if stored != self._stored:
+            self._stored = stored
+            self.store.update(self.job_id, stage=stage, progress=progress)
+
+class JobRunner:
+    """Bounded worker pool that runs queued jobs with ``handler(payload, progress)``.
+
+    Every job records the process that queued or is running it. Each runner
+    heartbeats in the store and, at start and every ``recover_interval``
+    seconds, adopts unfinished jobs whose owner is gone: a process on this
+    host that no longer exists, or one that hasn't heartbeated for
+    ``owner_ttl`` seconds. A job that has already been started
+    ``max_attempts`` times is failed rather than adopted, so a job that
+    kills its worker (e.g. out of memory) can't crash-loop the instance.
+    """
+
+    def __init__(self, store, handler, workers, queue_size, owner_ttl=60, recover_interval=15, max_attempts=3,
+                 broker=None):
+        self.store = store
+        self.handler = handler
+        self.broker = broker
+        self.workers = max(1, workers)
+        self.owner_ttl = owner_ttl
+        self.recover_interval = recover_interval
+        self.max_attempts = max(1, max_attempts)
+        self.host = socket.gethostname()
+        self.owner = f"{self.host}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+
+    def start(self):
+        self.store.heartbeat(self.owner)
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.recover()
+        thread = threading.Thread(target=self._maintain, name="job-recovery", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _owner_alive(self, owner, live_owners):
+        if owner is None:
+            return False
+        if owner == self.owner:
+            return True
+        host, _, rest = owner.partition(':')
+        pid = rest.partition(':')[0]
+        if host == self.host and pid.isdigit():
+            # Same machine: a missing pid (or our own pid under an older token) means the owner is gone
+            if int(pid) == os.getpid():
+                return False
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return False
+            except PermissionError:
+                pass
+        return owner in live_owners
+
+    def recover(self):
+        """Queue unfinished jobs whose owning process is gone; returns how many were adopted"""
+        live_owners = self.store.live_owners(self.owner_ttl)
+        adopted = 0
+        for job_id, owner, attempts in self.store.unfinished():
+            if self._owner_alive(owner, live_owners):
+                continue
+            if attempts >= self.max_attempts:
+                error = f"Job was interrupted {attempts} times (its worker process died) and was not retried"
+                if self.store.abandon(job_id, owner, error):
+                    print(f"Giving up on job {job_id} after {attempts} attempts")
+                    if self.broker:
+                        self.broker.close(job_id, 'failed', error=error)
+                continue
+            if self._queue.full():
+                print(f"Warning: Queue full, job {job_id} will be recovered later")
+                break
+            if not self.store.adopt(job_id, owner, self.owner):
+                continue   # Another worker adopted it first
+            try:
+                self._queue.put_nowait(job_id)
+            except queue.Full:
+                self.store.adopt(job_id, self.owner, None)   # Leave it for the next scan
+                break
+            adopted += 1
+            print(f"Recovered job {job_id}")
+        return adopted
+
+    def _maintain(self):
+        while True:
+            time.sleep(self.recover_interval)
+            try:
+                self.store.heartbeat(self.owner)
+                self.recover()
+            except Exception as e:
+                print(f"Warning: Job recovery failed: {str(e)}")
+
+    def submit(self, payload):
+        """Persist a job and queue it; raises QueueFull when the pool is saturated"""
+        if self._queue.full():
+            raise QueueFull("Too many jobs in progress, please try again shortly")
+        job_id = self.store.create(payload, owner=self.owner)
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            self.store.finish(job_id, error="Job queue is full")
+            raise QueueFull("Too many jobs in progress, please try again shortly")
+        if self.broker:
+            self.broker.publish(job_id, 'queued', 0.0, position=self._queue.qsize())
+        return job_id
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                payload = self.store.claim(job_id, self.owner)
+                if payload is None:
+                    continue   # Already claimed by another worker
+                print(f"\nStarting job {job_id}")
+                result = self.handler(payload, JobProgress(self.store, job_id, self.broker))
+                self.store.finish(job_id, result=result)
+                if self.broker:
+                    self.broker.close(job_id, 'done', 1.0, result=result)
+                print(f"Job {job_id} completed")
+            except Exception as e:
+                print(f"Job {job_id} failed: {str(e)}")
+                traceback.print_exc()
+                self.store.finish(job_id, error=str(e))
+                if self.broker:
+                    self.broker.close(job_id, 'failed', error=str(e))
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,210 @@
+import os
+import time
+import resource
+import threading
+import functools
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds (seconds) for stage duration histograms: TTS calls take ~1 s, renders minutes
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+BYTES_BUCKETS = tuple(2 ** power for power in range(24, 35))   # 16 MiB .. 16 GiB
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values]
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DURATION_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self):
+        """{labels: (count, sum)} for every series, e.g. to diff around a benchmark run"""
+        with self._lock:
+            return {key: (series['count'], series['sum']) for key, series in self._values.items()}
+
+    def render(self):
+        with self._lock:
+            values = [(key, dict(series, counts=list(series['counts']))) for key, series in self._values.items()]
+        lines = self._header()
+        for key, series in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series['counts']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format.
+
+    Recording is a dict update under a per-metric lock. ``collector``
+    callbacks are only run at scrape time, for values that are cheaper to
+    read on demand (cache statistics, current RSS).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name, help_text):
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DURATION_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def collector(self, callback):
+        """Register ``callback()`` to refresh gauges just before each scrape"""
+        self._collectors.append(callback)
+        return callback
+
+    def render(self):
+        for callback in self._collectors:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Warning: Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+stage_duration = registry.histogram('render_stage_duration_seconds', 'Wall time spent in each pipeline stage')
+stage_failures = registry.counter('render_stage_failures_total', 'Pipeline stage calls that raised or returned no result')
+stage_bytes = registry.counter('render_stage_bytes_total', 'Bytes produced or transferred by each pipeline stage')
+retries = registry.counter('render_retries_total', 'Retried external calls by operation and reason')
+job_peak_rss = registry.histogram('render_job_peak_rss_bytes', 'Peak process RSS observed while a job was running',
+                                  buckets=BYTES_BUCKETS)
+process_rss = registry.gauge('process_resident_memory_bytes', 'Current resident set size')
+process_peak_rss = registry.gauge('process_peak_resident_memory_bytes', 'Peak resident set size since start')
+
+def timed(stage, failed_when_none=False):
+    """Decorator recording the call's duration (and failures) under ``stage``"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                stage_failures.inc(stage=stage)
+                raise
+            finally:
+                stage_duration.observe(time.perf_counter() - start, stage=stage)
+            if failed_when_none and not result:
+                stage_failures.inc(stage=stage)
+            return result
+        return wrapper
+    return decorator
+
+def record_bytes(stage, amount):
+    if amount:
+        stage_bytes.inc(amount, stage=stage)
+
+def record_file_bytes(stage, path):
+    try:
+        record_bytes(stage, os.path.getsize(path))
+    except (OSError, TypeError):
+        pass
+
+def current_rss():
+    """Resident set size in bytes (from /proc, falling back to the peak on other platforms)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+@contextmanager
+def track_peak_rss(interval=0.5):
+    """Sample RSS in the background while the block runs and record the peak.
+
+    Jobs share the process, so with concurrent jobs the peak covers all of
+    them; it is still the number that decides whether a worker gets OOM-killed.
+    """
+    peak = [current_rss()]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(interval):
+            peak[0] = max(peak[0], current_rss())
+
+    sampler = threading.Thread(target=sample, name='rss-sampler', daemon=True)
+    sampler.start()
+    try:
+        yield peak
+    finally:
+        stop.set()
+        sampler.join()
+        peak[0] = max(peak[0], current_rss())
+        job_peak_rss.observe(peak[0])
+
+@registry.collector
+def _collect_process_memory():
+    process_rss.set(current_rss())
+    process_peak_rss.set(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
@@ -0,0 +1,370 @@
+import os
+import base64
+import io
+from functools import lru_cache
+import numpy as np
+from http_client import http_client
+from PIL import Image, ImageDraw, ImageFont
+
+APP_ROOT = os.path.dirname(os.path.realpath(__file__))
+STATIC_ROOT = os.path.join(APP_ROOT, 'static')
+
+# Browserless renderer for the chat interface. Measurements mirror
+# static/css/imessage.css so the frames line up with the Selenium captures.
+CHAT_LAYOUT = {
+    'width': 414,
+    'corner_radius': 20,
+    'header_padding': (8, 16),
+    'profile_size': 40,
+    'profile_margin': 5,
+    'header_font_size': 16,
+    'header_name_max_width': 140,
+    'container_padding': (12, 8),
+    'dynamic_padding': 4,
+    'message_margin': (6, 4, 5),          # top of first message, sides, bottom
+    'message_gap': 2,                     # .message + .message margin-top
+    'bubble_padding': (10, 14),
+    'bubble_radius': 22,
+    'bubble_max_ratio': 0.75,
+    'font_size': 16,
+    'line_height': 24,
+    'picture_max_ratio': 0.80,
+    'picture_max_height': 300,
+    'picture_radius': 12,
+}
+
+THEMES = {
+    'light': {
+        'header_bg': (242, 242, 247, 255),
+        'header_border': (229, 229, 234, 255),
+        'header_text': (0, 0, 0, 255),
+        'chat_bg': (255, 255, 255, 255),
+        'sender_bg': (10, 132, 255, 255),
+        'sender_text': (255, 255, 255, 255),
+        'receiver_bg': (233, 233, 235, 255),
+        'receiver_text': (0, 0, 0, 255),
+        'accent': (10, 132, 255, 255),
+    },
+    'dark': {
+        'header_bg': (28, 28, 30, 255),
+        'header_border': (44, 44, 46, 255),
+        'header_text': (255, 255, 255, 255),
+        'chat_bg': (0, 0, 0, 255),
+        'sender_bg': (10, 132, 255, 255),
+        'sender_text': (255, 255, 255, 255),
+        'receiver_bg': (44, 44, 46, 255),
+        'receiver_text': (255, 255, 255, 255),
+        'accent': (10, 132, 255, 255),
+    },
+}
+
+# Arial first, then metric-compatible fallbacks commonly found on Linux images
+FONT_CANDIDATES = {
+    'regular': ['arial.ttf', 'Arial.ttf',
+                '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+                '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'],
+    'medium': ['arialbd.ttf', 'Arial Bold.ttf',
+               '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf',
+               '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'],
+}
+
+@lru_cache(maxsize=16)
+def load_font(size, weight='regular'):
+    """Load (and cache) the first available font for a size and weight"""
+    for candidate in FONT_CANDIDATES.get(weight, FONT_CANDIDATES['regular']):
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=8192)
+def text_width(text, size, weight='regular'):
+    """Cached advance width of a run of text"""
+    return load_font(size, weight).getlength(text)
+
+def wrap_text(text, max_width, size):
+    """Greedy word wrap that also breaks words longer than a line"""
+    lines = []
+    for paragraph in text.split('\n'):
+        current = ''
+        for word in paragraph.split(' '):
+            candidate = f"{current} {word}" if current else word
+            if text_width(candidate, size) <= max_width:
+                current = candidate
+                continue
+
+            if current:
+                lines.append(current)
+                current = ''
+
+            # Break words that don't fit on a line of their own
+            while text_width(word, size) > max_width:
+                cut = len(word)
+                while cut > 1 and text_width(word[:cut], size) > max_width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            current = word
+        lines.append(current)
+    return lines
+
+def _static_path(source):
+    """Resolve an app-relative path such as /static/images/profile.jpg, refusing anything outside static/"""
+    path = os.path.realpath(os.path.join(APP_ROOT, source.lstrip('/')))
+    if os.path.commonpath([path, STATIC_ROOT]) != STATIC_ROOT:
+        raise ValueError(f"Refusing to load an image from outside static/: {source}")
+    return path
+
+@lru_cache(maxsize=64)
+def _load_image_bytes(source):
+    if source.startswith('data:'):
+        return base64.b64decode(source.split(',', 1)[1])
+    if source.startswith(('http://', 'https://')):
+        response = http_client.get(source, 'chat_image', timeout=15)
+        response.raise_for_status()
+        return response.content
+    with open(_static_path(source), 'rb') as image_file:
+        return image_file.read()
+
+def load_image(source):
+    """Load an image from a data URL, http(s) URL or path under the app's static/ directory"""
+    try:
+        return Image.open(io.BytesIO(_load_image_bytes(source))).convert('RGBA')
+    except Exception as e:
+        print(f"Error loading image for native renderer: {e}")
+        return None
+
+def _rounded_mask(size, radius, corners=None):
+    mask = Image.new('L', size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle(
+        [(0, 0), (size[0] - 1, size[1] - 1)], radius, fill=255, corners=corners
+    )
+    return mask
+
+def _draw_header(image, draw, header_data, theme):
+    layout = CHAT_LAYOUT
+    pad_y, pad_x = layout['header_padding']
+    width = layout['width']
+
+    header_name = (header_data or {}).get('headerName', 'John Doe') or ''
+    name_font = load_font(layout['header_font_size'], 'medium')
+    name_height = layout['header_font_size'] + 6   # Normal line height plus 2px padding top/bottom
+    height = pad_y * 2 + layout['profile_size'] + layout['profile_margin'] + name_height
+
+    draw.rectangle([(0, 0), (width, height)], fill=theme['header_bg'])
+    draw.line([(0, height), (width, height)], fill=theme['header_border'])
+
+    # Back chevron on the left, video icon on the right
+    mid = height // 2
+    draw.line([(pad_x + 16, mid - 11), (pad_x + 6, mid), (pad_x + 16, mid + 11)],
+              fill=theme['accent'], width=3, joint='curve')
+    icon_right = width - pad_x - 5
+    draw.rounded_rectangle([(icon_right - 26, mid - 7), (icon_right - 9, mid + 7)], 3,
+                           outline=theme['accent'], width=2)
+    draw.polygon([(icon_right - 9, mid - 2), (icon_right, mid - 7), (icon_right, mid + 7), (icon_right - 9, mid + 2)],
+                 outline=theme['accent'], width=2)
+
+    # Profile image in a circle
+    profile_source = (header_data or {}).get('profileImage', '')
+    profile = None
+    if profile_source and not profile_source.endswith('profile.jpg'):
+        profile = load_image(profile_source)
+    size = layout['profile_size']
+    x = (width - size) // 2
+    if profile is None:
+        # Default avatar: first letter of the name on iOS blue
+        draw.ellipse([(x, pad_y), (x + size - 1, pad_y + size - 1)], fill=(0, 122, 255, 255))
+        letter = header_name[0].upper() if header_name else '?'
+        letter_font = load_font(size // 2)
+        left, top, right, bottom = draw.textbbox((0, 0), letter, font=letter_font)
+        draw.text((x + (size - (right - left)) / 2 - left, pad_y + (size - (bottom - top)) / 2 - top),
+                  letter, font=letter_font, fill=(255, 255, 255, 255))
+    else:
+        # object-fit: cover
+        scale = max(size / profile.width, size / profile.height)
+        profile = profile.resize((max(size, round(profile.width * scale)), max(size, round(profile.height * scale))), Image.LANCZOS)
+        left = (profile.width - size) // 2
+        top = (profile.height - size) // 2
+        profile = profile.crop((left, top, left + size, top + size))
+        image.paste(profile, (x, pad_y), _rounded_mask((size, size), size // 2))
+
+    # Header name, truncated with an ellipsis like text-overflow
+    name = header_name
+    if text_width(name, layout['header_font_size'], 'medium') > layout['header_name_max_width']:
+        while name and text_width(name + '…', layout['header_font_size'], 'medium') > layout['header_name_max_width']:
+            name = name[:-1]
+        name += '…'
+    name_width = text_width(name, layout['header_font_size'], 'medium')
+    name_y = pad_y + size + layout['profile_margin'] + 2
+    draw.text(((width - name_width) / 2, name_y), name, font=name_font, fill=theme['header_text'])
+
+    return height + 1
+
+def _layout_bubble(msg, content_width):
+    """Work out the size of one message bubble"""
+    layout = CHAT_LAYOUT
+    if msg.get('type') == 'picture':
+        picture = load_image(msg['text'])
+        if picture is None:
+            return None
+        max_width = int(content_width * layout['picture_max_ratio'])
+        scale = min(1.0, max_width / picture.width, layout['picture_max_height'] / picture.height)
+        size = (max(1, round(picture.width * scale)), max(1, round(picture.height * scale)))
+        return {'kind': 'picture', 'image': picture.resize(size, Image.LANCZOS), 'size': size}
+
+    pad_y, pad_x = layout['bubble_padding']
+    max_text_width = int(content_width * layout['bubble_max_ratio'])
+    lines = wrap_text(msg['text'].strip(), max_text_width, layout['font_size'])
+    text_w = max(text_width(line, layout['font_size']) for line in lines)
+    size = (int(np.ceil(text_w)) + pad_x * 2, len(lines) * layout['line_height'] + pad_y * 2)
+    return {'kind': 'text', 'lines': lines, 'size': size}
+
+def _draw_tail(draw, x_edge, bottom, is_sender, bubble_color, bg_color):
+    """Draw the iMessage speech tail next to the bubble corner"""
+    if is_sender:
+        draw.rounded_rectangle([(x_edge - 12, bottom - 19), (x_edge + 7, bottom)], 15,
+                               fill=bubble_color, corners=(False, False, False, True))
+        draw.rounded_rectangle([(x_edge, bottom - 19), (x_edge + 9, bottom)], 10,
+                               fill=bg_color, corners=(False, False, False, True))
+    else:
+        draw.rounded_rectangle([(x_edge - 7, bottom - 19), (x_edge + 12, bottom)], 15,
+                               fill=bubble_color, corners=(False, False, True, False))
+        draw.rounded_rectangle([(x_edge - 9, bottom - 19), (x_edge, bottom)], 10,
+                               fill=bg_color, corners=(False, False, True, False))
+
+def render_chat_interface(messages, show_header=True, header_data=None):
+    """Draw the chat container for ``messages`` without a browser.
+
+    Same contract as ``capture_chat_interface``: an RGBA image with rounded
+    corners cropped to its content, or None on failure.
+    """
+    try:
+        layout = CHAT_LAYOUT
+        theme = THEMES['dark' if (header_data or {}).get('theme') == 'dark' else 'light']
+        width = layout['width']
+        container_pad_y, container_pad_x = layout['container_padding']
+        inner_left = container_pad_x + layout['dynamic_padding']
+        inner_right = width - container_pad_x - layout['dynamic_padding']
+        content_width = inner_right - inner_left
+        margin_top, margin_side, margin_bottom = layout['message_margin']
+
+        bubbles = []
+        for msg in messages:
+            if msg and msg.get('text'):
+                bubble = _layout_bubble(msg, content_width)
+                if bubble is not None:
+                    bubble['is_sender'] = bool(msg.get('is_sender'))
+                    bubbles.append(bubble)
+
+        name_height = layout['header_font_size'] + 6
+        header_height = (layout['header_padding'][0] * 2 + layout['profile_size']
+                         + layout['profile_margin'] + name_height + 1) if show_header else 0
+        chat_height = container_pad_y * 2
+        for index, bubble in enumerate(bubbles):
+            chat_height += (margin_top if index == 0 else layout['message_gap']) + bubble['size'][1] + margin_bottom
+        height = header_height + chat_height
+
+        image = Image.new('RGBA', (width, height), theme['chat_bg'])
+        draw = ImageDraw.Draw(image)
+        if show_header:
+            _draw_header(image, draw, header_data, theme)
+
+        font = load_font(layout['font_size'])
+        pad_y, pad_x = layout['bubble_padding']
+        y = header_height + container_pad_y
+        for index, bubble in enumerate(bubbles):
+            y += margin_top if index == 0 else layout['message_gap']
+            bubble_w, bubble_h = bubble['size']
+            if bubble['is_sender']:
+                x = inner_right - margin_side - bubble_w
+                bubble_color, text_color = theme['sender_bg'], theme['sender_text']
+            else:
+                x = inner_left + margin_side
+                bubble_color, text_color = theme['receiver_bg'], theme['receiver_text']
+
+            if bubble['kind'] == 'picture':
+                image.paste(bubble['image'], (x, y),
+                            _rounded_mask(bubble['size'], layout['picture_radius']))
+            else:
+                _draw_tail(draw, x + bubble_w if bubble['is_sender'] else x, y + bubble_h,
+                           bubble['is_sender'], bubble_color, theme['chat_bg'])
+                draw.rounded_rectangle([(x, y), (x + bubble_w - 1, y + bubble_h - 1)],
+                                       layout['bubble_radius'], fill=bubble_color)
+                for line_index, line in enumerate(bubble['lines']):
+                    # Centre the glyphs vertically inside the 24px line box
+                    line_y = y + pad_y + line_index * layout['line_height'] + (layout['line_height'] - layout['font_size']) / 2
+                    draw.text((x + pad_x, line_y), line, font=font, fill=text_color)
+
+            y += bubble_h + margin_bottom
+
+        # Apply the rounded corner mask and crop to content
+        output = Image.new('RGBA', image.size, (0, 0, 0, 0))
+        output.paste(image, mask=_rounded_mask(image.size, layout['corner_radius']))
+        bbox = output.getbbox()
+        if bbox:
+            output = output.crop(bbox)
+        return output
+
+    except Exception as e:
+        print(f"Error rendering chat interface natively: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def render_chat_sequence(messages, header_data=None, window_size=5, on_frame=None, needed=None):
+    """Native counterpart of ``capture_chat_sequence``"""
+    needed = range(len(messages)) if needed is None else sorted(needed)
+    frames = [None] * len(messages)
+    for done, index in enumerate(needed, start=1):
+        window_start = index - index % window_size
+        frames[index] = render_chat_interface(messages[window_start:index + 1],
+                                              show_header=index < window_size,
+                                              header_data=header_data)
+        if on_frame:
+            on_frame(done, len(needed))
+    return frames
+
+def pixel_diff(first, second):
+    """Mean absolute per-channel difference (0-255) between two RGBA frames.
+
+    Frames of different sizes are compared over their shared area and the
+    size mismatch is reported separately.
+    """
+    a = np.asarray(first.convert('RGBA'), dtype=np.int16)
+    b = np.asarray(second.convert('RGBA'), dtype=np.int16)
+    height = min(a.shape[0], b.shape[0])
+    width = min(a.shape[1], b.shape[1])
+    diff = np.abs(a[:height, :width] - b[:height, :width])
+    return {
+        'mean': float(diff.mean()),
+        'max': int(diff.max()),
+        'size_delta': (first.width - second.width, first.height - second.height),
+    }
+
+# Reference conversations used to compare the native and Selenium backends. ``tolerance``
+# bounds the mean pixel difference and the size mismatch in pixels; wrapped text allows
+# more because Pillow and Chrome break and anti-alias lines slightly differently.
+REFERENCE_CONVERSATIONS = {
+    'short_light': {
+        'header_data': {'headerName': 'John Doe', 'theme': 'light'},
+        'tolerance': {'mean': 6.0, 'size': 2},
+        'messages': [
+            {'id': 1, 'type': 'text', 'text': 'bro what', 'is_sender': True},
+            {'id': 2, 'type': 'text', 'text': 'you heard me', 'is_sender': False},
+        ],
+    },
+    'wrapped_dark': {
+        'header_data': {'headerName': 'A Very Long Contact Name Indeed', 'theme': 'dark'},
+        'tolerance': {'mean': 10.0, 'size': 6},
+        'messages': [
+            {'id': 1, 'type': 'text', 'is_sender': False,
+             'text': 'This is a much longer message that has to wrap over several lines of the bubble'},
+            {'id': 2, 'type': 'text', 'text': 'ok', 'is_sender': True},
+            {'id': 3, 'type': 'text', 'text': 'supercalifragilisticexpialidocious' * 3, 'is_sender': True},
+        ],
+    },
+}
@@ -0,0 +1,141 @@
+from bisect import bisect_right
+import numpy as np
+
+class PreparedOverlay:
+    """A still RGBA overlay prepared once for repeated blending.
+
+    The overlay is cropped to its visible (alpha > 0) area and to the canvas.
+    RGB is stored premultiplied by alpha (scaled by 255) as uint16, with a
+    single-channel inverse alpha that broadcasts over RGB, so a blend is one
+    multiply-add per channel inside the bounding box.
+    """
+
+    def __init__(self, image, position, start, duration, canvas_size):
+        rgba = np.asarray(image.convert('RGBA'), dtype=np.uint8)
+        canvas_w, canvas_h = canvas_size
+        x, y = position
+
+        # Clip the overlay to the canvas
+        left, top = max(0, -x), max(0, -y)
+        right = min(rgba.shape[1], canvas_w - x)
+        bottom = min(rgba.shape[0], canvas_h - y)
+        rgba = rgba[top:bottom, left:right]
+        x, y = x + left, y + top
+
+        # Shrink to the visible area
+        visible_rows = np.flatnonzero(rgba[:, :, 3].any(axis=1))
+        visible_cols = np.flatnonzero(rgba[:, :, 3].any(axis=0))
+        if visible_rows.size and visible_cols.size:
+            r0, r1 = visible_rows[0], visible_rows[-1] + 1
+            c0, c1 = visible_cols[0], visible_cols[-1] + 1
+            rgba = rgba[r0:r1, c0:c1]
+            x, y = x + c0, y + r0
+        else:
+            rgba = rgba[:0, :0]
+
+        alpha = rgba[:, :, 3:4].astype(np.uint16)
+        self.premultiplied = rgba[:, :, :3].astype(np.uint16) * alpha
+        self.inverse_alpha = 255 - alpha   # (h, w, 1)
+        self.box = (y, y + rgba.shape[0], x, x + rgba.shape[1])
+        self.start = start
+        self.end = start + duration
+
+    @property
+    def shape(self):
+        return self.premultiplied.shape
+
+    def blend_into(self, frame, scratch):
+        """Alpha-blend onto ``frame`` (uint8 RGB) in place; ``scratch`` is a uint16 work buffer"""
+        top, bottom, left, right = self.box
+        if bottom <= top or right <= left:
+            return
+        region = frame[top:bottom, left:right]
+        work = scratch[:bottom - top, :right - left]
+
+        # work = region * (255 - a) + rgb * a, then divide by 255 with rounding
+        np.multiply(region, self.inverse_alpha, out=work, casting='unsafe')
+        work += self.premultiplied
+        work += 128
+        work += work >> 8
+        work >>= 8
+        np.copyto(region, work, casting='unsafe')
+
+class OverlaySpec:
+    """An overlay waiting to be shown: prepared when it becomes visible, dropped after it ends.
+
+    ``image`` is an RGBA PIL image or a zero-argument callable returning one
+    (e.g. a loader for a PNG written to disk), so only the overlays on
+    screen are ever decoded and premultiplied at once.
+    """
+
+    def __init__(self, image, position, start, duration):
+        self.image = image
+        self.position = position
+        self.start = start
+        self.duration = duration
+        self.end = start + duration
+
+    def prepare(self, canvas_size):
+        image = self.image() if callable(self.image) else self.image
+        return PreparedOverlay(image, self.position, self.start, self.duration, canvas_size)
+
+class StaticOverlayCompositor:
+    """Composites still overlays onto background frames with reused buffers.
+
+    ``background_frame(t)`` returns the background as a uint8 RGB array and
+    ``overlays`` are OverlaySpecs. The returned frame buffer is reused by
+    the next call, so consumers must finish with it (e.g. write it to the
+    encoder) before asking for another.
+    """
+
+    def __init__(self, background_frame, size, overlays):
+        self.background_frame = background_frame
+        self.size = size
+        width, height = size
+        self.overlays = sorted(overlays, key=lambda overlay: overlay.start)
+        self._starts = [overlay.start for overlay in self.overlays]
+
+        # Running max of end times lets the lookup stop early
+        self._max_end = []
+        latest = float('-inf')
+        for overlay in self.overlays:
+            latest = max(latest, overlay.end)
+            self._max_end.append(latest)
+
+        self._frame = np.empty((height, width, 3), dtype=np.uint8)
+        self._scratch = np.empty((0, 0, 3), dtype=np.uint16)
+        self._prepared = {}   # id(spec) -> PreparedOverlay, only for overlays on screen
+
+    def active_overlays(self, t):
+        """Overlay specs visible at ``t`` (start <= t < end), in stacking order"""
+        active = []
+        index = bisect_right(self._starts, t) - 1
+        while index >= 0 and self._max_end[index] > t:
+            if self.overlays[index].end > t:
+                active.append(self.overlays[index])
+            index -= 1
+        active.reverse()
+        return active
+
+    def _prepare_active(self, t):
+        active = self.active_overlays(t)
+        visible = {id(spec) for spec in active}
+        for key in [key for key in self._prepared if key not in visible]:
+            del self._prepared[key]
+        prepared = []
+        for spec in active:
+            overlay = self._prepared.get(id(spec))
+            if overlay is None:
+                overlay = self._prepared[id(spec)] = spec.prepare(self.size)
+                height, width = overlay.shape[:2]
+                if height > self._scratch.shape[0] or width > self._scratch.shape[1]:
+                    self._scratch = np.empty((max(height, self._scratch.shape[0]),
+                                              max(width, self._scratch.shape[1]), 3), dtype=np.uint16)
+            prepared.append(overlay)
+        return prepared
+
+    def frame_at(self, t):
+        np.copyto(self._frame, self.background_frame(t)[:, :, :3])
+        for overlay in self._prepare_active(t):
+            overlay.blend_into(self._frame, self._scratch)
+        return self._frame
@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+
+PROGRESS_SETTINGS = {
+    'buffer_size': int(os.environ.get('PROGRESS_BUFFER_SIZE', '200')),   # Events kept per job
+    'retention': int(os.environ.get('PROGRESS_RETENTION_SECONDS', '900')),   # Finished jobs are forgotten after this
+    'heartbeat': 15,   # Seconds between keep-alive comments on an idle stream
+    'poll_interval': 2,   # Seconds between job store reads for jobs this process isn't running
+}
+
+class ProgressBroker:
+    """In-memory, bounded event buffers for running jobs.
+
+    Each job keeps at most ``buffer_size`` events; older ones are dropped, so
+    a client that reconnects with ``Last-Event-ID`` may miss intermediate
+    events but always sees the latest state. Subscribers block on a shared
+    condition until new events arrive.
+    """
+
+    def __init__(self, buffer_size=200, retention=900):
+        self.buffer_size = buffer_size
+        self.retention = retention
+        self._condition = threading.Condition()
+        self._jobs = {}
+
+    def _channel(self, job_id):
+        channel = self._jobs.get(job_id)
+        if channel is None:
+            channel = {
+                'events': deque(maxlen=self.buffer_size),
+                'next_id': 1,
+                'started_at': time.time(),
+                'closed_at': None,
+            }
+            self._jobs[job_id] = channel
+        return channel
+
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, channel in self._jobs.items()
+                       if channel['closed_at'] and channel['closed_at'] < cutoff]:
+            del self._jobs[job_id]
+
+    def publish(self, job_id, stage, progress=None, final=False, **details):
+        """Append a timestamped event for ``job_id`` and wake its subscribers; returns the event"""
+        with self._condition:
+            self._expire()
+            channel = self._channel(job_id)
+            now = time.time()
+            event = {
+                'id': channel['next_id'],
+                'job_id': job_id,
+                'stage': stage,
+                'progress': progress,
+                'timestamp': now,
+                'elapsed': round(now - channel['started_at'], 3),
+                'final': final,
+            }
+            event.update(details)
+            channel['next_id'] += 1
+            channel['events'].append(event)
+            if final:
+                channel['closed_at'] = now
+            self._condition.notify_all()
+        return event
+
+    def close(self, job_id, stage, progress=None, **details):
+        """Publish the job's last event (done or failed)"""
+        return self.publish(job_id, stage, progress, final=True, **details)
+
+    def has_job(self, job_id):
+        with self._condition:
+            return job_id in self._jobs
+
+    def events_since(self, job_id, last_id=0, timeout=None):
+        """Events newer than ``last_id``, waiting up to ``timeout`` seconds for one to arrive"""
+        deadline = time.time() + timeout if timeout else None
+        with self._condition:
+            while True:
+                channel = self._jobs.get(job_id)
+                events = [event for event in channel['events'] if event['id'] > last_id] if channel else []
+                if events or not deadline:
+                    return events
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return []
+                self._condition.wait(remaining)
+
+    def stream(self, job_id, last_id=0, heartbeat=15, load_job=None, poll_interval=2):
+        """Generator of Server-Sent Events text for ``job_id``, ending after the final event.
+
+        While this process has no events for the job (it runs in another
+        worker, or is waiting to be recovered after a restart), ``load_job()``
+        is polled for the stored record: stage changes are relayed and the
+        stream ends once the stored status is done or failed.
+        """
+        stored_state = None
+        idle = 0
+        while True:
+            polling = load_job is not None and not self.has_job(job_id)
+            wait = poll_interval if polling else heartbeat
+            events = self.events_since(job_id, last_id, timeout=wait)
+            if events:
+                idle = 0
+                for event in events:
+                    last_id = event['id']
+                    yield f"id: {event['id']}\ndata: {json.dumps(event)}\n\n"
+                    if event['final']:
+                        return
+                continue
+
+            if polling and not self.has_job(job_id):
+                job = load_job()
+                final = job is None or job['status'] in ('done', 'failed')
+                state = (job['stage'], job['progress']) if job else None
+                if final or state != stored_state:
+                    stored_state = state
+                    idle = 0
+                    # No id: these don't belong to this process's event sequence
+                    yield f"data: {json.dumps(_stored_event(job_id, job, final))}\n\n"
+                    if final:
+                        return
+                    continue
+
+            idle += wait
+            if idle >= heartbeat:
+                idle = 0
+                yield ": keep-alive\n\n"
+
+def _stored_event(job_id, job, final):
+    """Event built from a job's stored record (None for a job that no longer exists)"""
+    if job is None:
+        return {'job_id': job_id, 'stage': 'failed', 'progress': None, 'timestamp': time.time(),
+                'final': True, 'error': 'Job not found'}
+    event = {
+        'job_id': job_id,
+        'stage': job['status'] if final else job['stage'],
+        'progress': job['progress'],
+        'timestamp': time.time(),
+        'final': final,
+    }
+    if final:
+        event.update(result=job['result'], error=job['error'])
+    return event
+
+progress_broker = ProgressBroker(PROGRESS_SETTINGS['buffer_size'], PROGRESS_SETTINGS['retention'])
@@ -0,0 +1,76 @@
+import time
+import hashlib
+import threading
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, up to ``capacity``"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class ApiThrottle:
+    """Request pacing shared by every call made with one API key.
+
+    Calls take a token from the bucket before each request. When the API
+    answers 429 / system_busy, ``report_busy`` pauses *all* callers for the
+    key until the backoff expires, instead of each call backing off on its
+    own and hammering the API in parallel.
+    """
+
+    def __init__(self, rate, capacity, base_delay=3, max_delay=60):
+        self.bucket = TokenBucket(rate, capacity)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.busy_until = 0
+        self.busy_streak = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        while True:
+            with self._lock:
+                pause = self.busy_until - time.monotonic()
+            if pause <= 0:
+                break
+            time.sleep(pause)
+        self.bucket.acquire()
+
+    def report_busy(self, retry_after=None):
+        """Pause every caller; returns the delay that was applied"""
+        with self._lock:
+            if retry_after is None:
+                retry_after = min(self.max_delay, self.base_delay * (2 ** self.busy_streak))
+            self.busy_streak += 1
+            self.busy_until = max(self.busy_until, time.monotonic() + retry_after)
+            return retry_after
+
+    def report_success(self):
+        with self._lock:
+            self.busy_streak = 0
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+def get_throttle(api_key, rate, capacity):
+    """Return the shared throttle for an API key (keyed by hash, not the raw key)"""
+    key = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+    with _throttles_lock:
+        if key not in _throttles:
+            _throttles[key] = ApiThrottle(rate, capacity)
+        return _throttles[key]
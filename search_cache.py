@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+SEARCH_CACHE_SETTINGS = {
+    'ttl': float(os.environ.get('IMAGE_SEARCH_CACHE_TTL', '3600')),   # Seconds a result page is served from memory
+    'max_bytes': int(os.environ.get('IMAGE_SEARCH_CACHE_MB', '16')) * 1024 * 1024,
+    'prefetch': os.environ.get('IMAGE_SEARCH_PREFETCH', '1') != '0',   # Fetch page N+1 while page N is viewed
+    'prefetch_workers': 2,
+}
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class SearchCache:
+    """In-memory LRU of image search result pages with a TTL.
+
+    Entries are bounded by their JSON size rather than by count, so a few
+    huge pages can't crowd out memory. Lookups that miss for the same key
+    at the same time (including a prefetch) share one upstream request.
+    Fetches returning None (no results, upstream errors) are not cached.
+    """
+
+    def __init__(self, max_bytes, ttl, prefetch_workers=2):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires, size, value)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='search-prefetch')
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetches = 0
+
+    @staticmethod
+    def make_key(query, page, safe, img_size):
+        return (' '.join(query.lower().split()), int(page), safe, img_size)
+
+    def _lookup(self, key):
+        """Cached value or None; call with the lock held"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def _store(self, key, value):
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get_or_fetch(self, key, fetch):
+        """Cached value for ``key``, or ``fetch()``'s result (cached unless None)"""
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if leader:
+            self._run(key, fetch, flight)
+        else:
+            flight.done.wait()
+        if flight.error:
+            raise flight.error
+        return flight.value
+
+    def _run(self, key, fetch, flight):
+        try:
+            flight.value = fetch()
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                if flight.value is not None:
+                    self._store(key, flight.value)
+                del self._flights[key]
+            flight.done.set()
+
+    def prefetch(self, key, fetch):
+        """Fetch ``key`` in the background unless it is cached or already being fetched"""
+        with self._lock:
+            if key in self._flights or self._lookup(key) is not None:
+                return
+            flight = self._flights[key] = _Flight()
+            self.prefetches += 1
+
+        def run():
+            self._run(key, fetch, flight)
+            if flight.error:
+                print(f"Warning: Image search prefetch failed: {flight.error}")
+
+        self._executor.submit(run)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'prefetches': self.prefetches,
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+search_cache = SearchCache(
+    SEARCH_CACHE_SETTINGS['max_bytes'],
+    SEARCH_CACHE_SETTINGS['ttl'],
+    prefetch_workers=SEARCH_CACHE_SETTINGS['prefetch_workers'],
+)
@@ -0,0 +1,103 @@
+import os
+import io
+import json
+import shutil
+import hashlib
+import tempfile
+from PIL import Image
+from tts_cache import TTSCache
+
+SEGMENT_CACHE_SETTINGS = {
+    'enabled': os.environ.get('SEGMENT_CACHE', '1') != '0',
+    'directory': os.environ.get('SEGMENT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'render_cache')),
+    'frame_max_bytes': int(os.environ.get('FRAME_CACHE_MAX_MB', '256')) * 1024 * 1024,
+    'segment_max_bytes': int(os.environ.get('SEGMENT_CACHE_MAX_MB', '4096')) * 1024 * 1024,
+    'min_age': 15 * 60,
+}
+
+def _digest(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def image_digest(image):
+    """Hash of an image's pixels, size and mode"""
+    digest = hashlib.sha256(f"{image.mode}:{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+class FrameCache(TTSCache):
+    """Captured chat frames, keyed by everything that changes how a chat state looks"""
+
+    suffix = '.png'
+
+    @staticmethod
+    def make_key(window, show_header, header_data, backend):
+        header_data = header_data or {}
+        return _digest({
+            'window': [{key: msg.get(key) for key in ('type', 'text', 'is_sender')} for msg in window],
+            'show_header': show_header,
+            'profile_image': hashlib.sha256((header_data.get('profileImage') or '').encode()).hexdigest(),
+            'header_name': header_data.get('headerName'),
+            'theme': header_data.get('theme', 'light'),
+            'backend': backend,
+        })
+
+    def get_image(self, key):
+        path = self.get(key)
+        if not path:
+            return None
+        try:
+            with Image.open(path) as image:
+                return image.convert('RGBA')
+        except OSError:
+            return None
+
+    def put_image(self, key, image):
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG')
+        return self.put(key, buffer.getvalue())
+
+class SegmentCache(TTSCache):
+    """Encoded video-only segments, keyed by their overlays, timing, background and encode settings"""
+
+    suffix = '.mp4'
+
+    @staticmethod
+    def make_key(overlays, duration, background_id, background_offset, size, settings, rendition):
+        """``overlays`` are (image digest, position, start relative to the segment, duration) tuples"""
+        return _digest({
+            'overlays': [(digest, list(position), round(start, 4), round(item_duration, 4))
+                         for digest, position, start, item_duration in overlays],
+            'duration': round(duration, 4),
+            'background': background_id,
+            'background_offset': round(background_offset, 4),
+            'size': list(size),
+            'settings': {key: value for key, value in settings.items() if key != 'threads'},
+            'rendition': rendition,
+        })
+
+    def put_file(self, key, source_path):
+        """Move (or copy across filesystems) an encoded segment into the cache and return its path"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.move(source_path, temp_path)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._written(os.path.getsize(path))
+        return path
+
+frame_cache = FrameCache(
+    os.path.join(SEGMENT_CACHE_SETTINGS['directory'], 'frames'),
+    SEGMENT_CACHE_SETTINGS['frame_max_bytes'],
+    min_age=SEGMENT_CACHE_SETTINGS['min_age'],
+)
+segment_cache = SegmentCache(
+    os.path.join(SEGMENT_CACHE_SETTINGS['directory'], 'segments'),
+    SEGMENT_CACHE_SETTINGS['segment_max_bytes'],
+    min_age=SEGMENT_CACHE_SETTINGS['min_age'],
+)
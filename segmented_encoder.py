@@ -0,0 +1,254 @@
+import os
+import math
+import functools
+import multiprocessing
+from fractions import Fraction
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+from encoder import ENCODE_SETTINGS, rendition_graph, run_ffmpeg, _audio_codec_args
+from background_segment import BackgroundSegment
+from overlay_blend import OverlaySpec, StaticOverlayCompositor
+from segment_cache import image_digest
+from metrics import timed
+
+SEGMENT_SETTINGS = {
+    'workers': int(os.environ.get('SEGMENT_WORKERS', '0')) or os.cpu_count() or 1,
+    'min_seconds': float(os.environ.get('SEGMENT_MIN_SECONDS', '4')),   # Shorter segments cost more in process startup than they save
+    'segments_per_worker': 2,   # Extra segments even out uneven message lengths
+}
+
+class _SegmentDirectory:
+    """Workspace stand-in for worker processes (the real one holds a lock file that can't be pickled)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+def boundary_step(settings, spedup):
+    """Smallest time step that is a whole number of frames in every rendition.
+
+    Segment boundaries are snapped to this grid, so concatenated segments add
+    up to exactly the frames a single pass would produce.
+    """
+    step = Fraction(1, settings['fps'])
+    if spedup:
+        fast = Fraction(settings['speed_factor']).limit_denominator(100) / settings['fps']
+        step = Fraction(math.lcm(step.numerator, fast.numerator), math.gcd(step.denominator, fast.denominator))
+    return step
+
+def plan_segments(timeline, duration, step, count, min_seconds):
+    """Split [0, duration] at message starts into about ``count`` segments.
+
+    Returns (start, end) pairs on the ``step`` grid; the last one ends at
+    ``duration`` rounded up to the grid.
+    """
+    def snap(t):
+        return Fraction(round(Fraction(t) / step)) * step
+
+    total = Fraction(math.ceil(Fraction(duration) / step)) * step
+    target = max(Fraction(min_seconds), total / max(1, count))
+    boundaries = [Fraction(0)]
+    for item in timeline:
+        candidate = snap(item['start'])
+        if candidate - boundaries[-1] >= target and total - candidate >= Fraction(min_seconds):
+            boundaries.append(candidate)
+    boundaries.append(total)
+    return [(float(start), float(end)) for start, end in zip(boundaries, boundaries[1:])]
+
+def plan_window_segments(timeline, duration, step, window_size):
+    """Split [0, duration] where each chat window of ``window_size`` messages starts.
+
+    Boundaries depend only on the story's own timing, so the same content
+    always yields the same segments (which is what makes them cacheable).
+    """
+    def snap(t):
+        return Fraction(round(Fraction(t) / step)) * step
+
+    total = Fraction(math.ceil(Fraction(duration) / step)) * step
+    boundaries = [Fraction(0)]
+    for item in timeline:
+        if item['index'] % window_size == 0:
+            candidate = snap(item['start'])
+            if boundaries[-1] < candidate < total:
+                boundaries.append(candidate)
+    boundaries.append(total)
+    return [(float(start), float(end)) for start, end in zip(boundaries, boundaries[1:])]
+
+def _load_overlay(png_path):
+    with Image.open(png_path) as image:
+        return image.convert('RGBA')
+
+def _encode_segment(job):
+    """Worker: composite one segment and encode it, video only, into each rendition"""
+    settings = job['settings']
+    fps = settings['fps']
+    duration = job['end'] - job['start']
+    size = tuple(job['size'])
+
+    background = BackgroundSegment(job['background_path'], job['background_start'] + job['start'], duration,
+                                   fps=fps, size=size)
+    try:
+        overlays = [OverlaySpec(functools.partial(_load_overlay, png_path), position, start - job['start'], item_duration)
+                    for png_path, position, start, item_duration in job['overlays']]
+        compositor = StaticOverlayCompositor(background.get_frame, size, overlays)
+
+        graph, output_args = rendition_graph('[0:v]', None, size[1], job['outputs'], settings)
+        cmd = [
+            'ffmpeg', '-y', '-v', 'error', '-nostats',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{size[0]}x{size[1]}", '-r', str(fps), '-i', '-',
+            '-filter_complex', ';'.join(graph),
+        ] + output_args
+
+        frame_count = int(round(duration * fps))
+
+        def feed(stdin):
+            for index in range(frame_count):
+                stdin.write(compositor.frame_at(index / fps).data)
+
+        run_ffmpeg(cmd, _SegmentDirectory(job['directory']), log_name=f"ffmpeg_segment_{job['index']:03d}.log", feed=feed)
+    finally:
+        background.close()
+    return job['index'], duration
+
+def _concat_command(segment_lists, audio_path, outputs, settings):
+    """Join the segments of each rendition without re-encoding and mux in the single audio track"""
+    cmd = ['ffmpeg', '-y', '-v', 'error', '-nostats']
+    for list_path in segment_lists.values():
+        cmd += ['-f', 'concat', '-safe', '0', '-i', list_path]
+    if audio_path:
+        cmd += ['-i', audio_path]
+
+    names = list(segment_lists)
+    audio_index = len(names)
+    if audio_path and 'spedup' in names:
+        cmd += ['-filter_complex', f"[{audio_index}:a]asplit=2[aout][asrc];[asrc]atempo={settings['speed_factor']}[afast]"]
+    audio_labels = {'original': '[aout]', 'spedup': '[afast]'} if audio_path and 'spedup' in names else {'original': f"{audio_index}:a"}
+
+    for index, name in enumerate(names):
+        cmd += ['-map', f"{index}:v"]
+        if audio_path:
+            cmd += ['-map', audio_labels[name]] + _audio_codec_args(settings)
+        cmd += ['-c:v', 'copy', '-movflags', '+faststart', outputs[name]]
+    return cmd
+
+@timed('compose_encode')
+def encode_segmented(background, timeline, audio_path, duration, outputs, workspace, settings=None,
+                     on_progress=None, on_pass=None, workers=None, cache=None, window_size=5):
+    """Composite and encode the story in parallel segments, then concatenate them.
+
+    The timeline is cut at message boundaries (snapped to a frame grid shared
+    by every rendition) and each segment is composited and encoded, video
+    only, in its own process. The segments are joined with the concat
+    demuxer without re-encoding, and the audio, rendered once for the whole
+    story, is muxed in at the end so it has no seams. ``background`` is as
+    for ``compose_with_ffmpeg`` plus an ``id`` naming the source video;
+    ``audio_path`` is the premixed soundtrack WAV or None.
+
+    With a ``cache`` (SegmentCache), segments follow the chat windows of
+    ``window_size`` messages and are looked up by content before encoding,
+    so an edited story only re-encodes the segments whose inputs changed.
+    Returns ``outputs``.
+    """
+    settings = dict(ENCODE_SETTINGS, **(settings or {}))
+    on_pass = on_pass or (lambda name, **details: None)
+    workers = max(1, workers or SEGMENT_SETTINGS['workers'])
+
+    step = boundary_step(settings, 'spedup' in outputs)
+    if cache:
+        segments = plan_window_segments(timeline, duration, step, window_size)
+    else:
+        segments = plan_segments(timeline, duration, step, workers * SEGMENT_SETTINGS['segments_per_worker'],
+                                 SEGMENT_SETTINGS['min_seconds'])
+
+    jobs = []
+    for index, (start, end) in enumerate(segments):
+        items = [item for item in timeline if item['start'] < end and item['start'] + item['duration'] > start]
+        job = {
+            'index': index,
+            'start': start,
+            'end': end,
+            'size': background['size'],
+            'background_path': background['path'],
+            'background_start': background['start'],
+            'items': items,
+            'outputs': {name: workspace.path(f"segment_{index:03d}_{name}.mp4") for name in outputs},
+            'settings': settings,
+            'directory': workspace.directory,
+            'keys': {},
+            'cached': {},
+        }
+        if cache:
+            overlay_ids = []
+            for item in items:
+                if 'digest' not in item:
+                    item['digest'] = image_digest(item['image'])
+                overlay_ids.append((item['digest'], item['position'], item['start'] - start, item['duration']))
+            for name in outputs:
+                job['keys'][name] = cache.make_key(overlay_ids, end - start, background.get('id', background['path']),
+                                                   background['start'] + start, background['size'], settings, name)
+                job['cached'][name] = cache.get(job['keys'][name])
+        jobs.append(job)
+
+    pending = [job for job in jobs if not all(job['cached'].get(name) for name in outputs)]
+    pending_indexes = {job['index'] for job in pending}
+    workers = max(1, min(workers, len(pending)))
+    settings.setdefault('threads', max(1, (os.cpu_count() or 1) // workers))
+
+    # Overlays are handed to the workers as PNG files (only those an encode needs)
+    for job in pending:
+        job['overlays'] = []
+        for item in job['items']:
+            if 'png_path' not in item:
+                item['png_path'] = workspace.path(f"overlay_{item['index']:04d}.png")
+                item['image'].save(item['png_path'])
+            job['overlays'].append((item['png_path'], item['position'], item['start'], item['duration']))
+
+    print(f"\nEncoding {len(pending)} of {len(segments)} segments with {workers} processes: {', '.join(outputs)}")
+    on_pass('segments', count=len(segments), encoded=len(pending), cached=len(segments) - len(pending), workers=workers)
+    done_seconds = sum(job['end'] - job['start'] for job in jobs if job['index'] not in pending_indexes)
+    if pending:
+        # fork: the workers only need this module, and re-importing the app (spawn) would start its job runner
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+            worker_jobs = [{key: value for key, value in job.items() if key not in ('items', 'cached')} for job in pending]
+            futures = [executor.submit(_encode_segment, job) for job in worker_jobs]
+            for future in as_completed(futures):
+                _, seconds = future.result()
+                done_seconds += seconds
+                if on_progress:
+                    on_progress(min(1.0, done_seconds / max(duration, 1e-6)))
+
+    # Final location of every segment: the cache when there is one, otherwise the workspace
+    segment_paths = []
+    for job in jobs:
+        paths = {}
+        for name in outputs:
+            if job['index'] not in pending_indexes:
+                paths[name] = job['cached'][name]
+            elif cache:
+                paths[name] = cache.put_file(job['keys'][name], job['outputs'][name])
+            else:
+                paths[name] = job['outputs'][name]
+        segment_paths.append(paths)
+
+    segment_lists = {}
+    for name in outputs:
+        list_path = workspace.path(f"segments_{name}.txt")
+        with open(list_path, 'w') as f:
+            for paths in segment_paths:
+                f.write(f"file '{paths[name]}'\n")
+        segment_lists[name] = list_path
+
+    on_pass('concat', renditions=list(outputs))
+    run_ffmpeg(_concat_command(segment_lists, audio_path, outputs, settings), workspace, log_name='ffmpeg_concat.log')
+    if on_progress:
+        on_progress(1.0)
+
+    if not cache:
+        for paths in segment_paths:
+            for path in paths.values():
+                os.remove(path)
+    for name, path in outputs.items():
+        print(f"{name}: {path} ({os.path.getsize(path) / (1024 * 1024):.2f} MB)")
+    return outputs
@@ -0,0 +1,66 @@
+import subprocess
+import threading
+import numpy as np
+
+# ffmpeg raw sample format and codec for each PCM dtype decode_pcm can return
+PCM_FORMATS = {
+    np.dtype(np.float32): ('f32le', 'pcm_f32le'),
+    np.dtype(np.int16): ('s16le', 'pcm_s16le'),
+}
+
+def decode_pcm(path, sample_rate, channels=2, dtype=np.float32):
+    """Decode an audio file to PCM of shape (samples, channels), float32 or int16"""
+    dtype = np.dtype(dtype)
+    sample_format, codec = PCM_FORMATS[dtype]
+    cmd = [
+        'ffmpeg', '-v', 'error', '-nostdin',
+        '-i', path,
+        '-vn',
+        '-f', sample_format, '-acodec', codec,
+        '-ac', str(channels), '-ar', str(sample_rate),
+        '-'
+    ]
+    result = subprocess.run(cmd, capture_output=True, check=True)
+    return np.frombuffer(result.stdout, dtype=dtype).reshape(-1, channels)
+
+class SoundEffectBank:
+    """Sound effects decoded once into shared, read-only PCM buffers.
+
+    ``sources`` maps effect names to files (the app's SOUND_EFFECTS). Each
+    effect is decoded at ``sample_rate`` when the bank is loaded, so building
+    a timeline needs no file I/O or ffmpeg processes per message.
+    """
+
+    def __init__(self, sources, sample_rate, channels=2):
+        self.sources = sources
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(Re)decode every effect; effects that fail to decode are left out with a warning"""
+        buffers = {}
+        for name, path in self.sources.items():
+            try:
+                pcm = decode_pcm(path, self.sample_rate, self.channels)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"Warning: Could not load sound effect '{name}' from {path}: {e}")
+                continue
+            pcm.setflags(write=False)
+            buffers[name] = pcm
+        with self._lock:
+            self._buffers = buffers
+        print(f"Loaded {len(buffers)} sound effects at {self.sample_rate} Hz")
+        return self
+
+    def __contains__(self, name):
+        return name in self._buffers
+
+    def pcm(self, name):
+        """Shared (samples, channels) float32 buffer for ``name``, or None"""
+        return self._buffers.get(name)
+
+    def duration(self, name):
+        pcm = self._buffers.get(name)
+        return len(pcm) / self.sample_rate if pcm is not None else 0
@@ -0,0 +1,16 @@
+import os
+import sys
+import shutil
+import pytest
+
+# The app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None,
+                                     reason="ffmpeg/ffprobe not installed")
+
+@pytest.fixture
+def workspace(tmp_path):
+    from workspace import Workspace
+    with Workspace(str(tmp_path)) as ws:
+        yield ws
@@ -0,0 +1,91 @@
+"""The ffmpeg filter-graph compositor must render the same pictures as the MoviePy path"""
+import subprocess
+import pytest
+from conftest import requires_ffmpeg
+
+np = pytest.importorskip('numpy')
+Image = pytest.importorskip('PIL.Image')
+ImageDraw = pytest.importorskip('PIL.ImageDraw')
+pytest.importorskip('moviepy')
+
+pytestmark = requires_ffmpeg
+
+SIZE = (320, 576)
+FPS = 30
+DURATION = 3.0
+SETTINGS = {
+    'fps': FPS,
+    'height': SIZE[1],
+    'preset': 'ultrafast',
+    'crf': 12,
+    'full_size_background': True,
+    'spedup': False,
+}
+SAMPLE_TIMES = (0.25, 0.9, 1.1, 1.6, 2.4, 2.9)   # Either side of both overlay switches
+MAX_MEAN_DIFFERENCE = 3.0   # Per channel, 0-255: two lossy encodes of the same picture
+
+def _make_background(path):
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', f"testsrc2=size={SIZE[0]}x{SIZE[1]}:rate={FPS}:duration={DURATION + 1}",
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '10', '-pix_fmt', 'yuv420p', path
+    ], check=True)
+    return path
+
+def _overlay(size, fill, alpha):
+    """Chat-like card: a translucent rounded box with opaque text bars"""
+    image = Image.new('RGBA', size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.rounded_rectangle([0, 0, size[0] - 1, size[1] - 1], radius=16, fill=fill + (alpha,))
+    for row in range(3):
+        draw.rectangle([12, 14 + row * 26, size[0] - 40 - row * 20, 30 + row * 26], fill=(20, 20, 20, 255))
+    return image
+
+def _timeline():
+    return [
+        {'index': 0, 'image': _overlay((272, 100), (255, 255, 255), 230), 'position': (24, 72),
+         'start': 0.0, 'duration': 1.0},
+        {'index': 1, 'image': _overlay((272, 180), (0, 122, 255), 160), 'position': (24, 72),
+         'start': 1.0, 'duration': DURATION - 1.0},
+    ]
+
+def _frames_at(path, times):
+    frames = []
+    for t in times:
+        result = subprocess.run([
+            'ffmpeg', '-v', 'error', '-ss', f"{t:.3f}", '-i', path, '-frames:v', '1',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'
+        ], capture_output=True, check=True)
+        frames.append(np.frombuffer(result.stdout, dtype=np.uint8).reshape(SIZE[1], SIZE[0], 3).astype(np.int16))
+    return frames
+
+def test_ffmpeg_compositor_matches_moviepy(workspace):
+    from moviepy import VideoClip
+    from background_segment import BackgroundSegment
+    from overlay_blend import OverlaySpec, StaticOverlayCompositor
+    from encoder import encode_renditions
+    from ffmpeg_compositor import compose_with_ffmpeg
+
+    background_path = _make_background(workspace.path('background.mp4'))
+
+    # MoviePy path, as generate_video drives it
+    moviepy_output = {'original': workspace.path('moviepy.mp4')}
+    background = BackgroundSegment(background_path, 0.0, DURATION, fps=FPS, size=SIZE)
+    try:
+        overlays = [OverlaySpec(item['image'], item['position'], item['start'], item['duration'])
+                    for item in _timeline()]
+        compositor = StaticOverlayCompositor(background.get_frame, SIZE, overlays)
+        clip = VideoClip(frame_function=compositor.frame_at, duration=DURATION)
+        encode_renditions(clip, moviepy_output, workspace, settings=SETTINGS)
+    finally:
+        background.close()
+
+    # ffmpeg filter graph
+    ffmpeg_output = {'original': workspace.path('ffmpeg.mp4')}
+    segment_info = {'path': background_path, 'start': 0.0, 'looped': False, 'size': SIZE, 'source_size': SIZE}
+    compose_with_ffmpeg(segment_info, _timeline(), None, DURATION, ffmpeg_output, workspace, settings=SETTINGS)
+
+    for t, expected, actual in zip(SAMPLE_TIMES, _frames_at(moviepy_output['original'], SAMPLE_TIMES),
+                                   _frames_at(ffmpeg_output['original'], SAMPLE_TIMES)):
+        difference = float(np.abs(expected - actual).mean())
+        assert difference < MAX_MEAN_DIFFERENCE, f"frames at {t}s differ by {difference:.2f} on average"
@@ -0,0 +1,72 @@
+"""The native renderer must stay close to the Selenium captures and only read the images it is meant to"""
+import threading
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('PIL.Image')
+pytest.importorskip('requests')
+
+import native_renderer
+from native_renderer import REFERENCE_CONVERSATIONS, load_image, pixel_diff, render_chat_interface
+
+@pytest.mark.parametrize('source', [
+    '/etc/passwd',
+    'app.py',
+    '/static/../service-account.json',
+    'static/images/../../videogenerator_credentals.json',
+    'file:///etc/passwd',
+])
+def test_load_image_refuses_paths_outside_static(source):
+    with pytest.raises(ValueError):
+        native_renderer._load_image_bytes(source)
+    assert load_image(source) is None
+
+def test_load_image_reads_static_files():
+    image = load_image('/static/images/profile.jpg')
+    assert image is not None and image.mode == 'RGBA'
+
+@pytest.fixture(scope='module')
+def selenium_app(tmp_path_factory):
+    """The app served on a free port with its own one-driver Chrome pool; skips without Chrome"""
+    pytest.importorskip('flask')
+    pytest.importorskip('moviepy')
+    pytest.importorskip('selenium')
+    from werkzeug.serving import make_server
+
+    workdir = tmp_path_factory.mktemp('app')
+    with pytest.MonkeyPatch.context() as patch:
+        # The app reads these at import time
+        for name, path in (('JOB_DB_PATH', 'jobs.sqlite3'), ('TTS_CACHE_DIR', 'tts_cache'),
+                           ('SEGMENT_CACHE_DIR', 'render_cache'), ('WORKSPACE_ROOT', 'workspaces'),
+                           ('BACKGROUND_STORE_DIR', 'backgrounds')):
+            patch.setenv(name, str(workdir / path))
+        patch.setenv('BACKGROUND_PREFETCH', '0')
+        import app as app_module
+        from chrome_pool import ChromeDriverPool
+
+        server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        pool = ChromeDriverPool(size=1, max_uses=50, page_url=f"http://127.0.0.1:{server.server_port}")
+        try:
+            try:
+                with pool.session():
+                    pass
+            except Exception as e:
+                pytest.skip(f"Chrome is not available: {e}")
+            patch.setattr(app_module, 'chrome_pool', pool)
+            yield app_module
+        finally:
+            pool.shutdown()
+            server.shutdown()
+
+@pytest.mark.parametrize('name', sorted(REFERENCE_CONVERSATIONS))
+def test_native_frames_match_selenium(selenium_app, name):
+    reference = REFERENCE_CONVERSATIONS[name]
+    native = render_chat_interface(reference['messages'], header_data=reference['header_data'])
+    browser = selenium_app.capture_chat_interface(reference['messages'], header_data=reference['header_data'])
+    assert native is not None and browser is not None
+
+    diff = pixel_diff(native, browser)
+    tolerance = reference['tolerance']
+    assert diff['mean'] <= tolerance['mean'], f"{name}: {diff}"
+    assert all(abs(delta) <= tolerance['size'] for delta in diff['size_delta']), f"{name}: {diff}"
@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import fcntl
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+
+TTS_CACHE_SETTINGS = {
+    'directory': os.environ.get('TTS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'tts_cache')),
+    'max_bytes': int(os.environ.get('TTS_CACHE_MAX_MB', '512')) * 1024 * 1024,
+    'min_age': 15 * 60,   # Never evict entries used in the last 15 minutes (they may be mid-render)
+}
+
+class TTSCache:
+    """Content-addressed on-disk cache for synthesized speech.
+
+    Entries are keyed by a hash of everything that changes the audio. Writes
+    go to a temp file and are renamed into place, so readers in other
+    gunicorn workers never see partial files. Eviction is least recently
+    used (hits bump the file mtime) and runs under an exclusive file lock.
+
+    Each process keeps a running total of the cache size (from its last
+    scan plus its own writes since), so the directory is only walked when
+    that total passes the cap or every ``rescan_every`` writes, which
+    picks up what other workers have written. Eviction goes down to
+    ``low_water`` of the cap so a full cache isn't rescanned on every write.
+    """
+
+    suffix = '.mp3'
+
+    def __init__(self, directory, max_bytes, min_age=0, rescan_every=100, low_water=0.9):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+        self.rescan_every = rescan_every
+        self.low_water = low_water
+        self._total_bytes = None   # Unknown until the first scan
+        self._writes_since_scan = 0
+        self._stuck_over_cap = False   # Last scan couldn't get under the cap (every entry too recent)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._counter_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(text, voice_id, model_id, voice_settings):
+        payload = json.dumps({
+            'text': text,
+            'voice_id': voice_id,
+            'model_id': model_id,
+            'voice_settings': voice_settings,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}{self.suffix}")
+
+    def _count(self, name):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, key):
+        """Return the cached file path for ``key`` or None on a miss"""
+        path = self._path(key)
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return path
+
+    def put(self, key, content):
+        """Atomically store ``content`` under ``key`` and return its path"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(content)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self._written(len(content))
+        return path
+
+    def _written(self, size):
+        """Account for a new entry and evict if the cache may have outgrown its cap"""
+        with self._counter_lock:
+            self._writes_since_scan += 1
+            if self._total_bytes is not None:
+                self._total_bytes += size
+            over_cap = self._total_bytes is None or (self._total_bytes > self.max_bytes and not self._stuck_over_cap)
+            due = over_cap or self._writes_since_scan >= self.rescan_every
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Rescan the directory and, if it is over the cap, delete least recently used entries down to the low-water mark"""
+        with self._locked():
+            entries = []
+            total = 0
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith(self.suffix):
+                        continue
+                    file_path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(file_path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, file_path))
+                    total += stat.st_size
+
+            if total > self.max_bytes:
+                target = self.max_bytes * self.low_water
+                cutoff = time.time() - self.min_age
+                for mtime, size, file_path in sorted(entries):
+                    if total <= target or mtime > cutoff:
+                        break
+                    try:
+                        os.remove(file_path)
+                        total -= size
+                        self._count('evictions')
+                    except FileNotFoundError:
+                        pass
+
+            with self._counter_lock:
+                self._total_bytes = total
+                self._writes_since_scan = 0
+                self._stuck_over_cap = total > self.max_bytes
+
+    def stats(self):
+        with self._counter_lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+tts_cache = TTSCache(
+    TTS_CACHE_SETTINGS['directory'],
+    TTS_CACHE_SETTINGS['max_bytes'],
+    min_age=TTS_CACHE_SETTINGS['min_age'],
+)
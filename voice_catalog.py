@@ -0,0 +1,126 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from http_client import http_client
+
+VOICE_CATALOG_SETTINGS = {
+    'ttl': float(os.environ.get('VOICE_CATALOG_TTL', '600')),   # Seconds a voice listing is reused
+    'invalid_ttl': float(os.environ.get('VOICE_CATALOG_INVALID_TTL', '60')),   # Seconds an invalid key is remembered
+    'max_entries': 1024,
+    'timeout': 15,
+}
+
+# ElevenLabs answers these for a wrong, revoked or under-privileged key
+INVALID_KEY_STATUS = {401, 403}
+
+class VoiceListError(Exception):
+    """The voice listing could not be fetched; ``status_code`` is ElevenLabs' HTTP status"""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def invalid_key(self):
+        return self.status_code in INVALID_KEY_STATUS
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.voices = None
+        self.error = None
+
+class VoiceCatalog:
+    """ElevenLabs voice listings cached per API key.
+
+    Entries are keyed by a SHA-256 of the key (the key itself is never
+    stored) and reused for ``ttl`` seconds. Keys that ElevenLabs rejects are
+    remembered for ``invalid_ttl`` seconds so a bad key isn't retried on
+    every keystroke. Concurrent misses for the same key wait for one
+    request instead of each making their own. Other failures are not
+    cached.
+    """
+
+    def __init__(self, api_base, ttl=600, invalid_ttl=60, max_entries=1024, timeout=15):
+        self.api_base = api_base
+        self.ttl = ttl
+        self.invalid_ttl = invalid_ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()   # key hash -> (expires, voices or VoiceListError)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(api_key):
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+    def _fetch(self, api_key):
+        response = http_client.get(
+            f"{self.api_base}/v1/voices", 'voices',
+            headers={"xi-api-key": api_key},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise VoiceListError(response.status_code, f"Failed to fetch voices: {response.text}")
+        return response.json()['voices']
+
+    def voices(self, api_key):
+        """The account's voices (ElevenLabs' dicts); raises VoiceListError if they can't be listed"""
+        key = self._key(api_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if isinstance(entry[1], VoiceListError):
+                    raise entry[1]
+                return entry[1]
+            self.misses += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+        else:
+            try:
+                flight.voices = self._fetch(api_key)
+            except VoiceListError as e:
+                flight.error = e
+            except Exception as e:
+                flight.error = VoiceListError(None, f"Failed to fetch voices: {e}")
+            finally:
+                with self._lock:
+                    self._entries.pop(key, None)
+                    if flight.voices is not None:
+                        self._entries[key] = (time.monotonic() + self.ttl, flight.voices)
+                    elif flight.error.invalid_key:
+                        self._entries[key] = (time.monotonic() + self.invalid_ttl, flight.error)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                    del self._flights[key]
+                flight.done.set()
+
+        if flight.error:
+            raise flight.error
+        return flight.voices
+
+    def invalidate(self, api_key):
+        with self._lock:
+            self._entries.pop(self._key(api_key), None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,120 @@
+import os
+import time
+import uuid
+import fcntl
+import shutil
+import tempfile
+import threading
+
+WORKSPACE_SETTINGS = {
+    'root': os.environ.get('WORKSPACE_ROOT', os.path.join(tempfile.gettempdir(), 'render_workspaces')),
+    'quota_bytes': int(os.environ.get('WORKSPACE_QUOTA_MB', '4096')) * 1024 * 1024,
+    'min_age': 60,   # Never evict a workspace younger than this, even if it looks unowned
+}
+
+def _directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class Workspace:
+    """Scratch directory owned by one render job.
+
+    The owner holds an exclusive lock on ``.lock`` for the workspace's whole
+    life, which is how other processes tell live workspaces from abandoned
+    ones. Use it as a context manager so it is removed on success or failure.
+    """
+
+    def __init__(self, root, workspace_id=None):
+        self.id = workspace_id or uuid.uuid4().hex
+        self.directory = os.path.join(root, self.id)
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_file = open(os.path.join(self.directory, '.lock'), 'a')
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+    def path(self, name):
+        """Path for an intermediate or output file inside this workspace"""
+        return os.path.join(self.directory, name)
+
+    def cleanup(self):
+        if self._lock_file is None:
+            return
+        try:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            print(f"Cleaned up workspace: {self.directory}")
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.cleanup()
+        return False
+
+class WorkspaceManager:
+    """Creates workspaces under one root and keeps the root within a disk quota"""
+
+    def __init__(self, root, quota_bytes, min_age=60):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.min_age = min_age
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _is_abandoned(self, directory):
+        """True when no live process holds the workspace lock"""
+        lock_path = os.path.join(directory, '.lock')
+        try:
+            if time.time() - os.path.getmtime(directory) < self.min_age:
+                return False
+            with open(lock_path, 'a') as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                return True
+        except OSError:
+            return False
+
+    def evict_abandoned(self):
+        """Remove abandoned workspaces (oldest first) until usage fits the quota; returns usage"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            directory = os.path.join(self.root, name)
+            if not os.path.isdir(directory):
+                continue
+            size = _directory_size(directory)
+            total += size
+            entries.append((os.path.getmtime(directory), size, directory))
+
+        for mtime, size, directory in sorted(entries):
+            if total <= self.quota_bytes:
+                break
+            if self._is_abandoned(directory):
+                shutil.rmtree(directory, ignore_errors=True)
+                total -= size
+                print(f"Evicted abandoned workspace: {directory}")
+        return total
+
+    def create(self, workspace_id=None):
+        with self._lock:
+            usage = self.evict_abandoned()
+            if usage > self.quota_bytes:
+                raise Exception(f"Render disk quota exceeded ({usage / (1024 * 1024):.0f} MB in use)")
+            return Workspace(self.root, workspace_id)
+
+workspace_manager = WorkspaceManager(
+    WORKSPACE_SETTINGS['root'],
+    WORKSPACE_SETTINGS['quota_bytes'],
+    min_age=WORKSPACE_SETTINGS['min_age'],
+)